@@ -0,0 +1,329 @@
+"""Versioned JSON API under /api/v1.
+
+Lists, details and search reuse the query helpers behind the HTML views
+(and the same cached detail data), selecting plain columns rather than
+hydrating ORM objects. Lists page by opaque cursor: ``?after=<next>``
+with the ``next`` value of the previous page; searches page by
+``?offset=``, and /shows/search finds the shows of the artists and
+venues a term matches. Every GET response carries an ETag and answers
+a matching If-None-Match with 304.
+
+Creates take a JSON object with the same fields as the HTML forms and
+validate it with the same form classes. With SHOW_WRITES = "queued", a
+valid show is only queued: the answer is 202 with the booking, whose
+Location, /api/v1/bookings/<id>, says once it is booked or rejected.
+"""
+import datetime
+import json
+
+from flask import Blueprint, Response, current_app, request, url_for
+from sqlalchemy.exc import IntegrityError
+
+import bulk
+import conflicts
+import queries
+import search
+import show_queue
+import summaries
+from cache import cache_key
+from genres import set_genres
+from models import db, Venue, Show, Artist
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library
+    orjson = None
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+_CATALOG = {
+    "venues": (Venue, queries.venue_detail, "show_venue"),
+    "artists": (Artist, queries.artist_detail, "show_artist"),
+}
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, separators=(",", ":"), default=_default).encode()
+
+
+def json_response(payload, status=200, headers=None):
+    response = Response(
+        dumps(payload), status=status, headers=headers, mimetype="application/json"
+    )
+    if request.method == "GET" and status == 200:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+def error(status, message, **extra):
+    return json_response({"error": message, **extra}, status)
+
+
+def _cache():
+    return current_app.extensions["cache"]
+
+
+def _limit(default_key, max_key):
+    limit = request.args.get("limit", type=int) or current_app.config[default_key]
+    return max(1, min(limit, current_app.config[max_key]))
+
+
+#  Venues and artists
+#  ----------------------------------------------------------------
+
+def _list(entity):
+    model = _CATALOG[entity][0]
+    limit = _limit("API_PAGE_SIZE", "API_MAX_PAGE_SIZE")
+    after = request.args.get("after", type=int)
+
+    summaries.refresh_stale(entity)
+    rows = queries.catalog_page_query(model, after).limit(limit + 1).all()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+
+    return json_response({
+        "data": [
+            {
+                "id": id,
+                "name": name,
+                "city": city,
+                "state": state,
+                "genres": genres.split(summaries.GENRE_SEPARATOR) if genres else [],
+                "num_upcoming_shows": num_upcoming_shows,
+            }
+            for id, name, city, state, genres, num_upcoming_shows in rows[:limit]
+        ],
+        "next": next_cursor,
+    })
+
+
+def _public_detail(data):
+    """``data`` without the keys only the templates and the cache use.
+
+    Those are the show ``version`` stamps and ``next_show_time``, which
+    says when the cached entry expires.
+    """
+    shows = {
+        key: [
+            {name: value for name, value in show.items() if name != "version"}
+            for show in data[key]
+        ]
+        for key in ("past_shows", "upcoming_shows")
+    }
+    public = {key: value for key, value in data.items() if key != "next_show_time"}
+    return {**public, **shows}
+
+
+def _detail(entity, entity_id):
+    _, load, view = _CATALOG[entity]
+    data = _cache().get_or_set(
+        cache_key(view, entity_id),
+        lambda: load(entity_id),
+        expires_at=lambda data: data["next_show_time"],
+    )
+    if data is None:
+        return error(404, "not found")
+    return json_response(_public_detail(data))
+
+
+def _search(entity):
+    limit = _limit("API_PAGE_SIZE", "API_MAX_PAGE_SIZE")
+    offset = max(0, request.args.get("offset", 0, type=int))
+    find = search.search_venues if entity == "venues" else search.search_artists
+
+    count, data = find(request.args.get("q", ""), limit, offset)
+    return json_response({"count": count, "data": data})
+
+
+def _create(entity):
+    model = _CATALOG[entity][0]
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return error(400, "expected a JSON object")
+
+    data, errors = bulk.validate_row(entity, payload)
+    if errors:
+        return error(400, "invalid", errors=errors)
+
+    record = model(**bulk.model_values(entity, data))
+    db.session.add(record)
+    db.session.flush()
+    set_genres(entity, record.id, data["genres"], touch=False)
+    summaries.refresh(entity, [record.id])
+    db.session.commit()
+    _cache().delete(cache_key(entity))
+
+    return json_response(
+        {"id": record.id, "name": record.name},
+        201,
+        {"Location": url_for(f"api.{entity[:-1]}_detail", entity_id=record.id)},
+    )
+
+
+@api.route("/venues")
+def venue_list():
+    return _list("venues")
+
+
+@api.route("/venues", methods=["POST"])
+def venue_create():
+    return _create("venues")
+
+
+@api.route("/venues/search")
+def venue_search():
+    return _search("venues")
+
+
+@api.route("/venues/<int:entity_id>")
+def venue_detail(entity_id):
+    return _detail("venues", entity_id)
+
+
+@api.route("/artists")
+def artist_list():
+    return _list("artists")
+
+
+@api.route("/artists", methods=["POST"])
+def artist_create():
+    return _create("artists")
+
+
+@api.route("/artists/search")
+def artist_search():
+    return _search("artists")
+
+
+@api.route("/artists/<int:entity_id>")
+def artist_detail(entity_id):
+    return _detail("artists", entity_id)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def _show(row):
+    """A row of queries.shows_query() as JSON."""
+    start_time, artist_id, venue_id, artist_name, artist_image_link, venue_name, *_ = row
+    return {
+        "start_time": start_time,
+        "artist_id": artist_id,
+        "venue_id": venue_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "venue_name": venue_name,
+    }
+
+
+@api.route("/shows")
+def show_list():
+    when = request.args.get("when", "all")
+    if when not in queries.SHOW_FILTERS:
+        return error(400, f"when must be one of {', '.join(queries.SHOW_FILTERS)}")
+
+    try:
+        rows, next_cursor = queries.shows_page(
+            when, request.args.get("after"), request.args.get("limit", type=int)
+        )
+    except ValueError:
+        return error(400, "invalid cursor")
+
+    return json_response({"data": [_show(row) for row in rows], "next": next_cursor})
+
+
+@api.route("/shows/search")
+def show_search():
+    when = request.args.get("when", "all")
+    if when not in queries.SHOW_FILTERS:
+        return error(400, f"when must be one of {', '.join(queries.SHOW_FILTERS)}")
+    limit = _limit("API_PAGE_SIZE", "API_MAX_PAGE_SIZE")
+    offset = max(0, request.args.get("offset", 0, type=int))
+
+    count, rows = search.search_shows(request.args.get("q", ""), when, limit, offset)
+    return json_response({"count": count, "data": [_show(row) for row in rows]})
+
+
+@api.route("/shows/<int:show_id>")
+def show_detail(show_id):
+    row = queries.shows_query().filter(Show.id == show_id).first()
+    if row is None:
+        return error(404, "not found")
+    return json_response({"id": show_id, **_show(row)})
+
+
+@api.route("/shows", methods=["POST"])
+def show_create():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return error(400, "expected a JSON object")
+
+    data, errors = bulk.validate_row("shows", payload)
+    if errors:
+        return error(400, "invalid", errors=errors)
+
+    if show_queue.enabled():
+        booking_id = show_queue.enqueue(data)
+        return json_response(
+            show_queue.booking(booking_id),
+            202,
+            headers={"Location": url_for("api.booking_detail", booking_id=booking_id)},
+        )
+
+    if db.session.get(Artist, data["artist_id"]) is None:
+        return error(400, "invalid", errors={"artist_id": ["No such artist."]})
+    if db.session.get(Venue, data["venue_id"]) is None:
+        return error(400, "invalid", errors={"venue_id": ["No such venue."]})
+    clashes = conflicts.clashes(data["venue_id"], data["artist_id"], data["start_time"])
+    if clashes:
+        return error(409, "this show overlaps another booking", errors=clashes)
+
+    show = Show(
+        artist_id=data["artist_id"],
+        venue_id=data["venue_id"],
+        start_time=data["start_time"],
+    )
+    db.session.add(show)
+    try:
+        db.session.flush()
+        summaries.refresh_show(show.venue_id, show.artist_id)
+        db.session.commit()
+    except IntegrityError as refused:
+        db.session.rollback()
+        errors = conflicts.violation_errors(refused, data["venue_id"], data["artist_id"])
+        if "start_time" in errors:
+            return error(409, "this artist is already booked at this venue at that time")
+        return error(409, "this show overlaps another booking", errors=errors)
+
+    _cache().delete(
+        cache_key("venues"),
+        cache_key("show_venue", show.venue_id),
+        cache_key("show_artist", show.artist_id),
+    )
+    return json_response(
+        {
+            "id": show.id,
+            "artist_id": show.artist_id,
+            "venue_id": show.venue_id,
+            "start_time": show.start_time,
+        },
+        201,
+        {"Location": url_for("api.show_detail", show_id=show.id)},
+    )
+
+
+@api.route("/bookings/<int:booking_id>")
+def booking_detail(booking_id):
+    booking = show_queue.booking(booking_id)
+    if booking is None:
+        return error(404, "not found")
+    return json_response(booking)
@@ -2,129 +2,103 @@
 # Imports
 #----------------------------------------------------------------------------#
 from email.policy import default
+import os
 import sys
+import json
+import click
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
+import babel.dates
+import functools
+from flask import (
+    Flask, render_template, request, flash, redirect, url_for, jsonify, abort,
+    Response, stream_with_context,
+)
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from forms import *
+from models import db, Venue, Show, Artist
+import search
+import bulk
+import conflicts
+import explain
+import fragments
+import health
+import instrumentation
+import show_queue
+import config
+from genres import set_genres
+import summaries
+from api import api
+from queries import (
+    SHOW_FILTERS,
+    venue_browse,
+    venue_detail,
+    artist_browse,
+    artist_detail,
+    shows_page,
+    venues_version,
+    artists_version,
+    shows_version,
+    venue_version,
+    artist_version,
+)
+from http_cache import conditional, page_version
+from replicas import read_only, writes
+from cache import Cache, cache_key
 from flask_migrate import Migrate
-from sqlalchemy.orm import load_only
-from sqlalchemy import distinct
-import datetime
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from operator import itemgetter
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
 app = Flask(__name__)
 moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
+app.config.from_object(config.configs[os.environ.get("FLASK_ENV", "development")])
+if not app.config["SECRET_KEY"]:
+    raise RuntimeError("SECRET_KEY must be set")
+health.init_app(app)
+instrumentation.init_app(app)
+db.init_app(app)
 migrate = Migrate(app, db)
+cache = Cache(app)
+fragments.init_app(app)
+conflicts.init_app(app)
+show_queue.init_app(app)
+app.register_blueprint(api)
 
 # TODO: connect to a local postgresql database
 # app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
 
-#----------------------------------------------------------------------------#
-# Models.
-#----------------------------------------------------------------------------#
-
+# ----------------------------------------------------------------------------#
+# Filters.
+# ----------------------------------------------------------------------------#
 
-class Venue_Genre(db.Model):
-    __tablename__ = "venue_genres"
-    id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(
-        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
-    )
-    genre = db.Column(db.String(50), nullable=False)
-    owner = db.Column(db.String(50), default='Umar Abdullahi')
-
-
-class Venue(db.Model):
-    __tablename__ = "venues"
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    address = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=True)
-    owner = db.Column(db.String(50), default='Umar Abdullahi')
-    genres = db.relationship(
-        "Venue_Genre", passive_deletes=True, backref="venue", lazy=True,
-    )
-    seeking_talent = db.Column(db.Boolean, nullable=True, default=False)
-    seeking_description = db.Column(db.String(120), nullable=True)
-    image_link = db.Column(
-        db.String(500),
-        nullable=True,
-        default="https://images.unsplash.com/photo-1600585154084-4e5fe7c39198?ixlib=rb-1.2.1&ixid=MnwxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8&auto=format&fit=crop&w=870&q=80",
-    )
-    facebook_link = db.Column(db.String(120), nullable=True, default="")
-    website = db.Column(db.String(120), nullable=True)
 
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+DATETIME_FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
 
 
-class Show(db.Model):
-    __tablename__ = "shows"
-    artist_id = db.Column(db.Integer, db.ForeignKey(
-        "artists.id"), primary_key=True)
-    venue_id = db.Column(
-        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), primary_key=True
-    )
-    owner = db.Column(db.String(50), default='Umar Abdullahi')
-    start_time = db.Column(db.DateTime, nullable=False)
-
-
-class Artist_Genre(db.Model):
-    __tablename__ = "artist_genres"
-    id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey(
-        "artists.id"), nullable=False)
-    owner = db.Column(db.String(50), default='Umar Abdullahi')
-    genre = db.Column(db.String(50), nullable=False)
-
-
-class Artist(db.Model):
-    __tablename__ = "artists"
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=False)
-    genres = db.relationship("Artist_Genre", backref="artist", lazy=True)
-    owner = db.Column(db.String(50), default='Umar Abdullahi')
-    image_link = db.Column(
-        db.String(500),
-        nullable=True,
-        default="https://assets.about.me/background/users/u/m/a/umarabdullahi_1634476090_225.jpg",
-    )
-    facebook_link = db.Column(db.String(120), nullable=True)
-    venues = db.relationship(
-        "Venue", secondary="shows", backref=db.backref("artists", lazy=True)
+@functools.lru_cache(maxsize=128)
+def datetime_pattern(format, locale):
+    """Compiled Babel pattern and Locale for a filter format and locale."""
+    return (
+        babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)),
+        babel.Locale.parse(locale),
     )
-    seeking_venue = db.Column(db.Boolean, nullable=True, default=False)
-    seeking_description = db.Column(db.String(30), nullable=True, default="")
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
-
-# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
-
-# ----------------------------------------------------------------------------#
-# Filters.
-# ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+def format_datetime(value, format="medium", locale=babel.dates.LC_TIME):
+    # Views pass datetimes; only strings (e.g. form input) need parsing.
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    pattern, locale = datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
 
 
 app.jinja_env.filters["datetime"] = format_datetime
@@ -135,153 +109,118 @@ app.jinja_env.filters["datetime"] = format_datetime
 
 
 @app.route("/")
+@conditional(lambda: (("home",), None))
 def index():
     return render_template("pages/home.html")
 
 
-#  Venues
+#  Cache invalidation
 #  ----------------------------------------------------------------
 
-def venue_upcoming_show(venue_id):
-    Show.query.filter_by(venue_id=venue_id).filter(
-        Show.start_time > datetime.datetime.now()).all()
+def venue_cache_keys(venue_id, artist_ids=None):
+    """Keys of every cached view that renders venue ``venue_id``.
 
+    ``artist_ids`` are the artists it has shows with, when the caller
+    already looked them up.
+    """
+    if artist_ids is None:
+        artist_ids = summaries.show_partners("venues", venue_id)
+    return [cache_key("venues"), cache_key("show_venue", venue_id)] + [
+        cache_key("show_artist", artist_id) for artist_id in artist_ids
+    ]
 
-@app.route("/venues")
-def venues():
-    # TODO: replace with real venues data.
-  #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
 
-    data = []
+def artist_cache_keys(artist_id, venue_ids=None):
+    """Keys of every cached view that renders artist ``artist_id``.
+
+    ``venue_ids`` are the venues it has shows at, when the caller
+    already looked them up.
+    """
+    if venue_ids is None:
+        venue_ids = summaries.show_partners("artists", artist_id)
+    return [cache_key("artists"), cache_key("show_artist", artist_id)] + [
+        cache_key("show_venue", venue_id) for venue_id in venue_ids
+    ]
 
-    try:
-        locations = db.session.query(
-            distinct(Venue.city), Venue.state).all()
-        for location in locations:
-            city = location[0]
-            state = location[1]
-
-            location_data = {"city": city, "state": state, "venues": []}
-
-            for venue in (Venue.query.filter_by(
-                    state=state, city=city).all()):
-                name = venue.name
-                id = venue.id
-
-                upcoming_shows = (
-                    Show.query.filter_by(venue_id=id)
-                    .filter(Show.start_time > datetime.datetime.now())
-                    .all()
-                )
 
-                venue_data = {
-                    "id": id,
-                    "name": name,
-                    "num_upcoming_shows": len(upcoming_shows),
-                }
+#  Venues
+#  ----------------------------------------------------------------
 
-                location_data["venues"].append(venue_data)
+def browse_filters():
+    """The ``genre`` and ``state`` query arguments; 400 unless canonical."""
+    genre = request.args.get("genre") or None
+    state = request.args.get("state") or None
+    if (genre is not None and genre not in GENRES) or (
+        state is not None and state not in STATES
+    ):
+        abort(400)
+    return genre, state
 
-            data.append(location_data)
+
+@app.route("/venues")
+@conditional(venues_version)
+def venues():
+    genre, state = browse_filters()
+    data = {"areas": [], "facets": {"genre": [], "state": []}}
+
+    try:
+        # Only the unfiltered page is cached; its key is the one every
+        # venue write invalidates.
+        if genre is None and state is None:
+            data = cache.get_or_set(
+                cache_key("venues"),
+                venue_browse,
+                expires_at=itemgetter("next_show_time"),
+                version=page_version(),
+            )
+        else:
+            data = venue_browse(genre, state)
 
     except:
         flash("Cannot fetch, Try Again!!!")
         return render_template("pages/home.html")
 
-    finally:
-        return render_template("pages/venues.html", areas=data)
+    return render_template(
+        "pages/venues.html",
+        areas=data["areas"],
+        facets=data["facets"],
+        genre=genre,
+        state=state,
+    )
 
 
 @app.route("/venues/search", methods=["POST"])
+@read_only
 def search_venues():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-    search = request.form.get("search_term", "")
-
-    search_response = {"count": 0, "data": []}
-
-    fields = ["id", "name"]
-
-    search_response["count"] = len(db.session.query(Venue)
-                                   .filter(Venue.name.ilike(f"%{search}%"))
-                                   .options(load_only(*fields))
-                                   .all())
-
-    for result in (db.session.query(Venue)
-                   .filter(Venue.name.ilike(f"%{search}%"))
-                   .options(load_only(*fields))
-                   .all()):
-        item = {
-            "id": result.id,
-            "name": result.name,
-        }
-        search_response["data"].append(item)
+    # Partial, case-insensitive match on name, city/state and genres; one
+    # query returns both the total count and the first page of hits.
+    search_term = request.form.get("search_term", "")
+
+    count, data = search.search_venues(search_term)
+    search_response = {"count": count, "data": data}
 
     return render_template(
         "pages/search_venues.html",
         results=search_response,
-        search_term=request.form.get("search_term", ""),
+        search_term=search_term,
     )
 
 
 @app.route("/venues/<int:venue_id>")
+@conditional(venue_version)
 def show_venue(venue_id):
-    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     data = {}
 
     try:
-        if (Venue.query.get(venue_id)) is None:
+        data = cache.get_or_set(
+            cache_key("show_venue", venue_id),
+            lambda: venue_detail(venue_id),
+            expires_at=itemgetter("next_show_time"),
+            version=page_version(),
+        )
+        if data is None:
             return render_template("errors/404.html"), 404
 
-        genres = []
-        for item in (Venue.query.get(venue_id)).genres:
-            genres.append(item.genre)
-
-        shows = Show.query.filter_by(venue_id=venue_id)
-        past_shows = []
-        for show in (shows.filter(Show.start_time < datetime.datetime.now()).all()):
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        shows = shows.filter(Show.start_time >= datetime.datetime.now()).all()
-        upcoming_shows = []
-        for show in shows:
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
-        venue = Venue.query.get(venue_id)
-        data = {
-            "id": venue.id,
-            "name": venue.name,
-            "genres": genres,
-            "address": venue.address,
-            "city": venue.city,
-            "state": venue.state,
-            "phone": venue.phone,
-            "website": venue.website,
-            "facebook_link": venue.facebook_link,
-            "seeking_talent": venue.seeking_talent,
-            "image_link": venue.image_link,
-            "past_shows": past_shows,
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "upcoming_shows_count": len(upcoming_shows),
-        }
-
     except:
         flash("Cannot fetch, Try Again!!!")
 
@@ -323,15 +262,15 @@ def create_venue_submission():
             facebook_link=facebook_link,
         )
 
-        genres_for_this_venue = []
-        for genre in genres:
-            current_genre = Venue_Genre(genre=genre)
-            current_genre.venue = venue
-            genres_for_this_venue.append(current_genre)
-
         db.session.add(venue)
+        db.session.flush()
+        set_genres("venues", venue.id, genres, touch=False)
+        summaries.refresh("venues", [venue.id])
+        # Read before the commit expires it.
+        venueName = venue.name
         db.session.commit()
-        flash(f"{venue.name} was successfully added!")
+        cache.delete(cache_key("venues"))
+        flash(f"{venueName} was successfully added!")
 
     except:
         db.session.rollback()
@@ -347,18 +286,25 @@ def create_venue_submission():
 
 
 @app.route("/venues/<venue_id>/delete", methods=["GET"])
+@writes
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
 
   # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
   # clicking that button delete it from the db then redirect the user to the homepage
+    name = f"Venue {venue_id}"
     try:
         venue_to_be_deleted = db.session.query(
             Venue).filter(Venue.id == venue_id)
+        name = venue_to_be_deleted.with_entities(Venue.name).scalar() or name
+        artist_ids = summaries.show_partners("venues", venue_id)
+        stale_keys = venue_cache_keys(venue_id, artist_ids)
         venue_to_be_deleted.delete()
+        summaries.refresh("venues", [venue_id])
+        summaries.refresh("artists", artist_ids)
         db.session.commit()
-        name = Venue.query.get(venue_id).name
+        cache.delete(*stale_keys)
         flash(f"{name} was successfully deleted.")
 
     except:
@@ -373,110 +319,56 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route("/artists")
+@conditional(artists_version)
 def artists():
-    # TODO: replace with real data returned from querying the database
-    fields = ["id", "name"]
-    artists_data = db.session.query(Artist).options(load_only(*fields)).all()
+    genre, state = browse_filters()
+    if genre is None and state is None:
+        data = cache.get_or_set(
+            cache_key("artists"), artist_browse, version=page_version()
+        )
+    else:
+        data = artist_browse(genre, state)
 
-    return render_template("pages/artists.html", artists=artists_data)
+    return render_template(
+        "pages/artists.html",
+        artists=data["artists"],
+        facets=data["facets"],
+        genre=genre,
+        state=state,
+    )
 
 
 @app.route("/artists/search", methods=["POST"])
+@read_only
 def search_artists():
-    # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-  # search for "band" should return "The Wild Sax Band".
-    search = request.form.get("search_term", "")
-
-    response = {"count": 0, "data": []}
-
-    fields = ["id", "name"]
-    results = (
-        db.session.query(Artist)
-        .filter(Artist.name.ilike(f"%{search}%"))
-        .options(load_only(*fields))
-        .all()
-    )
+    # Same search engine as search_venues(), over artists.
+    search_term = request.form.get("search_term", "")
 
-    num_upcoming_shows = 0
-
-    response["count"] = len(results)
-
-    for result in results:
-        item = {
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": num_upcoming_shows,
-        }
-        response["data"].append(item)
+    count, data = search.search_artists(search_term)
+    response = {"count": count, "data": data}
 
     return render_template(
         "pages/search_artists.html",
         results=response,
-        search_term=request.form.get("search_term", ""),
+        search_term=search_term,
     )
 
 
 @app.route("/artists/<int:artist_id>")
+@conditional(artist_version)
 def show_artist(artist_id):
-    # shows the artist page with the given artist_id
-  # TODO: replace with real artist data from the artist table, using artist_id
     data = {}
 
     try:
-        artist = Artist.query.get(artist_id)
-
-        if artist is None:
+        data = cache.get_or_set(
+            cache_key("show_artist", artist_id),
+            lambda: artist_detail(artist_id),
+            expires_at=itemgetter("next_show_time"),
+            version=page_version(),
+        )
+        if data is None:
             return render_template("errors/404.html"), 404
 
-        genres = []
-        for item in artist.genres:
-            genres.append(item.genre)
-
-        shows = Show.query.filter_by(artist_id=artist_id)
-
-        raw_past_shows = shows.filter(
-            Show.start_time < datetime.datetime.now()).all()
-        past_shows = []
-        for show in raw_past_shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        shows = shows.filter(
-            Show.start_time >= datetime.datetime.now()).all()
-        upcoming_shows = []
-        for show in shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
-
-        data = {
-            "id": artist.id,
-            "name": artist.name,
-            "genres": genres,
-            "city": artist.city,
-            "state": artist.state,
-            "phone": artist.phone,
-            "seeking_venue": False,
-            "facebook_link": artist.facebook_link,
-            "image_link": artist.image_link,
-            "past_shows": past_shows,
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "upcoming_shows_count": len(upcoming_shows),
-        }
-
     except:
         flash("Cannot Fetch. Please try again.")
 
@@ -502,7 +394,7 @@ def edit_artist(artist_id):
         genres = []
         if len(artist.genres) > 0:
             for item in artist.genres:
-                genres.append(item.genre)
+                genres.append(item.name)
 
         data = {
             "id": artist.id,
@@ -545,21 +437,21 @@ def edit_artist_submission(artist_id):
         genres = request.form.getlist("genres")
         facebook_link = request.form.get("facebook_link")
 
-        artist = name
+        artist.name = name
         artist.city = city
         artist.state = state
         artist.phone = phone
         artist.facebook_link = facebook_link
         artist.image_link = "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80"
 
-        genres = []
-        for genre in genres:
-            artistGenre = Artist_Genre(genre=genre)
-            artistGenre.artist = artist
-            genres.append(artistGenre)
+        set_genres("artists", artist_id, genres)
+        db.session.flush()
+        summaries.refresh("artists", [artist_id])
 
+        stale_keys = artist_cache_keys(artist_id)
         db.session.add(artist)
         db.session.commit()
+        cache.delete(*stale_keys)
         flash("This venue was successfully updated!")
 
     except:
@@ -590,7 +482,7 @@ def edit_venue(venue_id):
         genres = []
         if len(venue.genres) > 0:
             for item in venue.genres:
-                genres.append(item.genre)
+                genres.append(item.name)
 
         data = {
             "id": venue.id,
@@ -636,14 +528,14 @@ def edit_venue_submission(venue_id):
         venue.phone = phone
         venue.facebook_link = facebook_link
 
-        genres = []
-        for genre in genres:
-            venueGenre = Venue_Genre(genre=genre)
-            venueGenre.venue = venue
-            genres.append(venueGenre)
+        set_genres("venues", venue_id, genres)
+        db.session.flush()
+        summaries.refresh("venues", [venue_id])
 
+        stale_keys = venue_cache_keys(venue_id)
         db.session.add(venue)
         db.session.commit()
+        cache.delete(*stale_keys)
         flash("This venue was successfully updated!")
 
     except:
@@ -683,15 +575,14 @@ def create_artist_submission():
             name=name, city=city, state=state, phone=phone, facebook_link=facebook_link
         )
 
-        genres = []
-        for genre in genres:
-            artistGenre = Artist_Genre(genre=genre)
-            artistGenre.artist = artist
-            genres.append(artistGenre)
-
         db.session.add(artist)
-        db.session.commit()
+        db.session.flush()
+        set_genres("artists", artist.id, genres, touch=False)
+        summaries.refresh("artists", [artist.id])
+        # Read before the commit expires it.
         artistName = artist.name
+        db.session.commit()
+        cache.delete(cache_key("artists"))
         flash(f"{artistName} was successfully Added!")
 
     except:
@@ -705,22 +596,30 @@ def create_artist_submission():
 
 
 @app.route("/artists/<artist_id>/delete", methods=["GET"])
+@writes
 def delete_artist(artist_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
 
   # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
   # clicking that button delete it from the db then redirect the user to the homepage
+    name = f"Artist {artist_id}"
     try:
         artist = db.session.query(
             Artist).filter(Artist.id == artist_id)
+        name = artist.with_entities(Artist.name).scalar() or name
+        venue_ids = summaries.show_partners("artists", artist_id)
+        stale_keys = artist_cache_keys(artist_id, venue_ids)
         artist.delete()
+        summaries.refresh("artists", [artist_id])
+        summaries.refresh("venues", venue_ids)
         db.session.commit()
-        flash(f"{artist.name} was successfully deleted.")
+        cache.delete(*stale_keys)
+        flash(f"{name} was successfully deleted.")
 
     except:
         db.session.rollback()
-        flash(f"{artist.name} was not deleted.")
+        flash(f"{name} was not deleted.")
 
     finally:
         db.session.close()
@@ -730,34 +629,45 @@ def delete_artist(artist_id):
 #  Shows
 #  ----------------------------------------------------------------
 @app.route("/shows")
+@conditional(shows_version)
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
+    # displays list of shows at /shows, one keyset-paginated page at a time
+    when = request.args.get("when", "all")
+    if when not in SHOW_FILTERS:
+        abort(400)
+    after = request.args.get("after")
+    per_page = request.args.get("per_page", type=int)
+
     data = []
+    next_cursor = None
 
     try:
-        allShows = Show.query.all()
-        for show in allShows:
-            venue_id = show.venue_id
-            artist_id = show.artist_id
-            artist = Artist.query.get(artist_id)
-
-            showInShows = {
+        rows, next_cursor = shows_page(when, after, per_page)
+        for (start_time, artist_id, venue_id, artist_name, artist_image_link,
+             venue_name, artist_updated_at, venue_updated_at) in rows:
+            data.append({
                 "venue_id": venue_id,
-                "venue_name": Venue.query.get(venue_id).name,
+                "venue_name": venue_name,
                 "artist_id": artist_id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
+                "artist_name": artist_name,
+                "artist_image_link": artist_image_link,
+                "start_time": start_time,
+                "version": (artist_updated_at, venue_updated_at),
+            })
 
-            data.append(showInShows)
+    except ValueError:
+        abort(400)
 
     except:
         flash("Something went wrong, please try again.")
 
-    finally:
-        return render_template("pages/shows.html", shows=data)
+    return render_template(
+        "pages/shows.html",
+        shows=data,
+        when=when,
+        per_page=per_page,
+        next_cursor=next_cursor,
+    )
 
 
 @app.route("/shows/create")
@@ -774,6 +684,16 @@ def create_show_submission():
 
     # on successful db insert, flash success
 
+    if show_queue.enabled():
+        data, invalid = bulk.validate_row("shows", request.form.to_dict())
+        if invalid:
+            for field, messages in invalid.items():
+                flash(f"{field}: {' '.join(messages)}")
+        else:
+            booking_id = show_queue.enqueue(data)
+            flash(f"The show has been submitted for booking (booking #{booking_id}).")
+        return render_template("pages/home.html")
+
     errors = {"notArtist": False, "notVenue": False}
 
     try:
@@ -790,19 +710,43 @@ def create_show_submission():
             errors["notVenue"] = True
 
         if venue is not None and artist is not None:
-            show = Show(
-                artist_id=artist.id,
-                venue_id=venue.id,
-                start_time=start_time,
-            )
-            db.session.add(show)
-            db.session.commit()
-            artistName = artist.name
-            venueName = venue.name
-            flash(
-                f"The show by {artistName} has been successfully scheduled at the {venueName}")
+            start_time = dateutil.parser.parse(start_time)
+            clashes = conflicts.clashes(venue.id, artist.id, start_time)
+            for messages in clashes.values():
+                flash(" ".join(messages))
+
+            if not clashes:
+                show = Show(
+                    artist_id=artist.id,
+                    venue_id=venue.id,
+                    start_time=start_time,
+                )
+                db.session.add(show)
+                db.session.flush()
+                summaries.refresh_show(venue.id, artist.id)
+                # Read before the commit expires them.
+                artistName = artist.name
+                venueName = venue.name
+                db.session.commit()
+                cache.delete(
+                    cache_key("venues"),
+                    cache_key("show_venue", venue_id),
+                    cache_key("show_artist", artist_id),
+                )
+                flash(
+                    f"The show by {artistName} has been successfully scheduled at the {venueName}")
+
+    except IntegrityError as error:
+        db.session.rollback()
+        refused = conflicts.violation_errors(error, venue_id, artist_id)
+        if "start_time" in refused:
+            flash("This artist is already booked at this venue at that time.")
+        else:
+            for messages in refused.values():
+                flash(" ".join(messages))
 
     except:
+        db.session.rollback()
         flash("Something went wrong and the show was not created. Please try again.")
 
     finally:
@@ -818,6 +762,18 @@ def create_show_submission():
     return render_template("pages/home.html")
 
 
+#  Export
+#  ----------------------------------------------------------------
+@app.route("/export/<any(venues, artists, shows):entity>.<any(jsonl, csv):fmt>")
+def export(entity, fmt):
+    # streamed straight from a server-side cursor, a chunk at a time
+    return Response(
+        stream_with_context(bulk.iter_export(entity, fmt)),
+        mimetype=bulk.export_mimetype(fmt),
+        headers={"Content-Disposition": f"attachment; filename={entity}.{fmt}"},
+    )
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
@@ -828,7 +784,7 @@ def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
+if not app.debug and not app.testing:
     file_handler = FileHandler("error.log")
     file_handler.setFormatter(
         Formatter(
@@ -839,6 +795,100 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info("errors")
 
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+
+@app.cli.command("import")
+@click.argument("entity", type=click.Choice(bulk.ENTITIES))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="File format; guessed from the extension by default.")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--rejects", type=click.Path(dir_okay=False),
+              help="Write rejected rows and their errors here as JSONL.")
+def import_command(entity, path, fmt, batch_size, rejects):
+    """Bulk import venues, artists or shows from a CSV or JSONL file."""
+    report = bulk.import_file(entity, path, fmt, batch_size)
+    cache.clear()
+
+    print(
+        f"{entity}: {report.accepted} imported, {len(report.rejected)} rejected "
+        f"in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)"
+    )
+    for rejected in report.rejected[:10]:
+        print(f"  line {rejected['line']}: {rejected['errors']}")
+    if rejects:
+        with open(rejects, "w", encoding="utf-8") as file:
+            for rejected in report.rejected:
+                file.write(json.dumps(rejected, default=str) + "\n")
+
+
+@app.cli.command("export")
+@click.argument("entity", type=click.Choice(bulk.ENTITIES))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              default="jsonl", show_default=True)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-",
+              help="Destination file; standard output by default.")
+def export_command(entity, fmt, output):
+    """Stream venues, artists or shows out as CSV or JSONL."""
+    for chunk in bulk.iter_export(entity, fmt):
+        output.write(chunk)
+
+
+@app.cli.command("show-worker")
+@click.option("--batch-size", type=int,
+              help="Bookings per transaction; SHOW_QUEUE_BATCH_SIZE by default.")
+@click.option("--once", is_flag=True, help="Stop when the queue is empty.")
+def show_worker(batch_size, once):
+    """Write queued show bookings to the database in batches."""
+    show_queue.run(batch_size, once=once)
+
+
+@app.cli.command("explain-views")
+def explain_views():
+    """Fail if a view's main query scans a hot table sequentially."""
+    venue_id = db.session.query(func.min(Venue.id)).scalar() or 1
+    artist_id = db.session.query(func.min(Artist.id)).scalar() or 1
+
+    failures = 0
+    for view, plan, offending in explain.check_views(venue_id, artist_id):
+        status = "ok" if not offending else "SEQ SCAN on " + ", ".join(sorted(offending))
+        print(f"{view}: {status}")
+        for line in plan:
+            print(f"    {line}")
+        failures += bool(offending)
+
+    if failures:
+        sys.exit(1)
+
+
+@app.cli.command("refresh-summaries")
+@click.option("--stale", is_flag=True,
+              help="Only rebuild rows whose next show has started.")
+def refresh_summaries(stale):
+    """Rebuild the venue and artist summary tables."""
+    for entity in ("venues", "artists"):
+        if stale:
+            count = summaries.refresh_stale(entity)
+            print(f"{entity}: {count} stale summaries rebuilt")
+        else:
+            summaries.refresh(entity)
+            db.session.commit()
+            print(f"{entity}: summaries rebuilt")
+    cache.clear()
+
+
+@app.cli.command("search-reindex")
+def search_reindex():
+    """Rebuild the SQLite FTS5 search tables from the catalog."""
+    if db.engine.dialect.name != "sqlite":
+        print("search-reindex is only needed for the SQLite fallback")
+        return
+    search.rebuild_sqlite_index()
+    print("search index rebuilt")
+
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
@@ -0,0 +1,5 @@
+"""Benchmarks for Fyyur's hot queries and views.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the
+project root and builds its own database from the app's models.
+"""
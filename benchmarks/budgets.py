@@ -0,0 +1,150 @@
+"""Query-count budgets for every route.
+
+Each scenario of benchmarks.routes has a budget: the most SQL
+statements one of its requests may run with a cold read cache. The
+check seeds the catalog at several sizes and fails if a request goes
+over its budget, or runs more statements on a bigger catalog than on
+the smallest one, which is how a per-row query in a view or a template
+loop shows up long before it is slow.
+
+    python -m benchmarks.budgets [--database-url URL]
+
+exits with status 1 on any failure; tests/test_query_budgets.py runs the
+same check under pytest. A new route needs a scenario in
+benchmarks.routes and a budget here.
+"""
+import argparse
+import datetime
+import sys
+
+from app import app, cache
+from benchmarks import data, routes
+
+# Reads: the page version token (which alone answers a 304), then the
+# page's own queries. Writes: the lookups, the write and the summary
+# refreshes (a delete of ownerless rows and an upsert per summary
+# table); each is noted where it goes past 3.
+BUDGETS = {
+    "home": 0,
+    # Version token; listing rows, from which the facets are counted.
+    "venues": 2,
+    # As /venues, plus the facet rows: each facet counts the venues
+    # matching every filter but its own, which the listing rows are not.
+    "venues ?state=CA": 3,
+    # Version token; venue with its genres; shows joined to artists.
+    "venue": 3,
+    "venue search": 2,
+    "venue form": 0,
+    # Insert, genre lookup, current links, link insert, summary refresh.
+    "venue create": 6,
+    "venue edit form": 2,
+    # Load, update, genre lookup, current links, link delete and insert,
+    # updated_at bump for the genre change, summary refresh, and the
+    # artists it plays with, whose cached pages show it.
+    "venue edit": 10,
+    # Name, partners, delete (cascading to shows), then the summary
+    # refreshes of the venue and of its partners.
+    "venue delete": 7,
+    "artists": 2,
+    "artists ?state=CA": 3,
+    "artist": 3,
+    "artist search": 2,
+    "artist form": 0,
+    "artist create": 6,
+    "artist edit form": 2,
+    "artist edit": 10,
+    "artist delete": 7,
+    # Version token; one page of shows, however many there are.
+    "shows": 2,
+    "show form": 0,
+    # Both lookups, the conflict check, the insert, both summary refreshes.
+    "show create": 8,
+    "export venues.csv": 2,
+    "export shows.jsonl": 1,
+    "api venues": 2,
+    "api venue": 3,
+    "api venue search": 2,
+    # As the form, plus a reload of the new row for the response.
+    "api venue create": 7,
+    "api artists": 2,
+    "api artist": 3,
+    "api artist search": 2,
+    "api artist create": 7,
+    "api shows": 1,
+    "api show": 1,
+    "api show search": 1,
+    # As the form, plus a reload of the new show for the response.
+    "api show create": 9,
+    "api booking": 0,
+    "healthz": 1,
+    "metrics": 0,
+}
+
+# (venues, artists, shows) of the catalogs checked, smallest first.
+SIZES = [(20, 20, 200), (100, 100, 2000), (400, 400, 10000)]
+
+
+def count_queries(client, item, counter):
+    send = routes.prepare(client, item, cold=True)
+    counter.count = 0
+    response = send()
+    response.get_data()
+    if response.status_code >= 400:
+        raise RuntimeError(f"{item.label}: {response.status_code}")
+    return counter.count
+
+
+def check(sizes=SIZES):
+    """Failure messages; empty when every route keeps to its budget."""
+    counter = routes.QueryCounter()
+    failures = [
+        f"{item.label}: no budget" for item in routes.SCENARIOS if item.label not in BUDGETS
+    ]
+    failures += [f"{endpoint}: no scenario" for endpoint in routes.missing_endpoints()]
+    smallest = {}
+    # Shows start 7 to 11 hours after a multiple of days from ``start``,
+    # so none starts while the check runs and turns a summary stale,
+    # which would add the statements of its refresh.
+    start = datetime.datetime.now() - datetime.timedelta(hours=12)
+
+    for venues, artists, shows in sizes:
+        with app.app_context():
+            data.generate(venues, artists, shows, start=start)
+            cache.clear()
+            client = app.test_client()
+            for item in routes.SCENARIOS:
+                queries = count_queries(client, item, counter)
+                smallest.setdefault(item.label, queries)
+                budget = BUDGETS.get(item.label)
+                if budget is not None and queries > budget:
+                    failures.append(
+                        f"{item.label}: {queries} queries at {shows} shows, budget {budget}"
+                    )
+                if queries > smallest[item.label]:
+                    failures.append(
+                        f"{item.label}: {smallest[item.label]} queries at "
+                        f"{sizes[0][2]} shows but {queries} at {shows}"
+                    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    data.use_database(args.database_url)
+    app.config.update(
+        WTF_CSRF_ENABLED=False, SLOW_REQUEST_MS=sys.maxsize, SHOW_QUEUE_PATH=routes.QUEUE_PATH
+    )
+
+    failures = check()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"{len(routes.SCENARIOS)} routes within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
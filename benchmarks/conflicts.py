@@ -0,0 +1,115 @@
+"""Show conflict checks per second, on a large catalog.
+
+Seeds ``--shows`` shows (a million by default), then checks the same
+random bookings over the next ``--days`` for overlaps three ways:
+scanning every show of the booking's venue and artist, as a check
+without the start_time indexes would; with conflicts.clashes(), one
+indexed range query per booking; and with a conflicts.Schedule, as
+imports and the show queue worker do a batch. All three must find the
+same conflicts. A batch loads the shows of its venues and artists
+between its first booking and its last, so it pays off for bookings
+close together, like an on-sale burst.
+
+    python -m benchmarks.conflicts [--database-url URL] [--shows K]
+                                   [--checks N] [--scan-checks S] [--days D]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from sqlalchemy import select
+
+import conflicts
+from app import app
+from models import db, Show
+from benchmarks import data
+
+
+def scan_clashes(venue_id, artist_id, start_time):
+    """Whether the booking overlaps a show, going through all of its owners'."""
+    length = conflicts.block()
+    for column, owner in ((Show.venue_id, venue_id), (Show.artist_id, artist_id)):
+        for other in db.session.scalars(select(Show.start_time).where(column == owner)):
+            if abs(other - start_time) < length:
+                return True
+    return False
+
+
+def bookings(rng, count, venues, artists, start, days):
+    """Bookings over the ``days`` after ``start``, as popular as the shows."""
+    venue_weights = data.zipf_weights(venues, 0.8)
+    artist_weights = data.zipf_weights(artists, 0.8)
+    return [
+        (
+            rng.choices(range(1, venues + 1), venue_weights)[0],
+            rng.choices(range(1, artists + 1), artist_weights)[0],
+            start + datetime.timedelta(
+                days=rng.randrange(days), minutes=rng.randint(17 * 60, 24 * 60)
+            ),
+        )
+        for _ in range(count)
+    ]
+
+
+def timed(function, items):
+    started = time.perf_counter()
+    found = function(items)
+    return found, len(items) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--venues", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=1000)
+    parser.add_argument("--shows", type=int, default=1000000)
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--scan-checks", type=int, default=200,
+                        help="Bookings checked by scanning, a slice of --checks.")
+    parser.add_argument("--days", type=int, default=30,
+                        help="Upcoming days the bookings fall on.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data.use_database(args.database_url)
+    with app.app_context():
+        started = time.perf_counter()
+        data.generate(args.venues, args.artists, args.shows, args.seed)
+        print(f"seeded {args.shows} shows in {time.perf_counter() - started:.0f}s")
+
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        items = bookings(
+            random.Random(args.seed), args.checks, args.venues, args.artists, start, args.days
+        )
+        scanned = items[:args.scan_checks]
+
+        def by_scan(items):
+            return [scan_clashes(*item) for item in items]
+
+        def by_query(items):
+            return [bool(conflicts.clashes(*item)) for item in items]
+
+        def by_schedule(items):
+            schedule = conflicts.Schedule(items)
+            return [bool(schedule.clashes(*item)) for item in items]
+
+        rows = []
+        scan_found, rate = timed(by_scan, scanned)
+        rows.append(("scan", len(scanned), rate))
+        query_found, rate = timed(by_query, items)
+        rows.append(("indexed query", len(items), rate))
+        schedule_found, rate = timed(by_schedule, items)
+        rows.append(("schedule (batch)", len(items), rate))
+
+        if scan_found != query_found[:len(scanned)] or query_found != schedule_found:
+            raise SystemExit("the checks disagree")
+
+    print(f"{sum(query_found)} of {len(items)} bookings conflict")
+    print(f"{'check':<18} {'bookings':>8} {'checks/s':>10}")
+    for label, count, rate in rows:
+        print(f"{label:<18} {count:>8} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
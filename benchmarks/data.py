@@ -0,0 +1,181 @@
+"""Deterministic synthetic catalog for the benchmarks.
+
+generate() fills the current database with venues, artists and shows
+drawn from a seeded random generator, so two runs with the same sizes,
+seed and start date produce the same rows. Popularity is skewed the way
+real listings are: a few cities and genres account for most venues and
+artists, and a few venues and artists book most of the shows.
+
+    python -m benchmarks.data [--database-url URL] [--venues N] [--artists M] [--shows K]
+
+seeds a database to load-test a running server against.
+"""
+import argparse
+import datetime
+import itertools
+import random
+
+from sqlalchemy import insert
+
+from app import app
+from config import engine_options
+from models import db, Venue, Show, Artist
+from forms import GENRES
+from genres import association, genre_ids
+import summaries
+
+CITIES = [
+    ("San Francisco", "CA"),
+    ("New York", "NY"),
+    ("Los Angeles", "CA"),
+    ("Chicago", "IL"),
+    ("Austin", "TX"),
+    ("Nashville", "TN"),
+    ("Seattle", "WA"),
+    ("New Orleans", "LA"),
+    ("Denver", "CO"),
+    ("Portland", "OR"),
+    ("Atlanta", "GA"),
+    ("Boston", "MA"),
+    ("Minneapolis", "MN"),
+    ("Detroit", "MI"),
+    ("Philadelphia", "PA"),
+    ("Miami", "FL"),
+]
+
+# Shows are spread over this many days before and after the start date.
+PAST_DAYS = 365
+UPCOMING_DAYS = 180
+
+
+def use_database(url):
+    """Point the app at ``url``, with the engine options that suit it.
+
+    The options config.py built for DATABASE_URL (a PostgreSQL pool) do
+    not fit, say, an in-memory SQLite database.
+    """
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url)
+
+
+def zipf_weights(count, exponent=1.0):
+    """Weights making the first of ``count`` items the most likely."""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def _genres(rng, genres, weights):
+    return sorted(set(rng.choices(genres, weights, k=rng.randint(1, 3))))
+
+
+def _owners(rng, model, count, city_weights, genres, genre_weights):
+    rows, owner_genres = [], {}
+    for owner_id in range(1, count + 1):
+        city, state = rng.choices(CITIES, city_weights)[0]
+        kind = "Venue" if model is Venue else "Artist"
+        # Fresh tables number rows from 1 in insertion order.
+        row = {
+            "name": f"{kind} {owner_id}",
+            "city": city,
+            "state": state,
+            "phone": f"555-{rng.randint(0, 9999):04d}",
+            "seeking_description": "",
+        }
+        if model is Venue:
+            row["address"] = f"{rng.randint(1, 999)} Main St"
+            row["seeking_talent"] = rng.random() < 0.3
+        else:
+            row["seeking_venue"] = rng.random() < 0.3
+        rows.append(row)
+        owner_genres[owner_id] = _genres(rng, genres, genre_weights)
+    return rows, owner_genres
+
+
+def _shows(rng, count, venues, artists, start):
+    # Cumulative weights make each draw a bisection instead of a sum.
+    venue_ids, venue_weights = range(1, venues + 1), list(
+        itertools.accumulate(zipf_weights(venues, 0.8))
+    )
+    artist_ids, artist_weights = range(1, artists + 1), list(
+        itertools.accumulate(zipf_weights(artists, 0.8))
+    )
+    seen = set()
+    rows = []
+    while len(rows) < count:
+        venue_id = rng.choices(venue_ids, cum_weights=venue_weights)[0]
+        artist_id = rng.choices(artist_ids, cum_weights=artist_weights)[0]
+        start_time = start + datetime.timedelta(
+            days=rng.randint(-PAST_DAYS, UPCOMING_DAYS), hours=rng.randint(19, 23)
+        )
+        if (venue_id, artist_id, start_time) in seen:
+            continue
+        seen.add((venue_id, artist_id, start_time))
+        rows.append(
+            {"venue_id": venue_id, "artist_id": artist_id, "start_time": start_time}
+        )
+    return rows
+
+
+def generate(venues=1000, artists=1000, shows=20000, seed=0, start=None):
+    """Replace the database's contents with a synthetic catalog.
+
+    Every size must be at least 1. ``start`` (default: today at
+    midnight) splits the shows into past and upcoming ones. Returns the
+    row counts per table.
+    """
+    rng = random.Random(seed)
+    start = start or datetime.datetime.combine(datetime.date.today(), datetime.time())
+    city_weights = zipf_weights(len(CITIES))
+    # Popularity order of the genres, so it is not the alphabetical one.
+    genres = rng.sample(GENRES, len(GENRES))
+    genre_weights = zipf_weights(len(genres))
+
+    db.drop_all()
+    db.create_all()
+
+    venue_rows, venue_genres = _owners(
+        rng, Venue, venues, city_weights, genres, genre_weights
+    )
+    artist_rows, artist_genres = _owners(
+        rng, Artist, artists, city_weights, genres, genre_weights
+    )
+    db.session.execute(insert(Venue), venue_rows)
+    db.session.execute(insert(Artist), artist_rows)
+
+    ids = genre_ids(GENRES)
+    for entity, owner_genres in (("venues", venue_genres), ("artists", artist_genres)):
+        table, owner = association(entity)
+        db.session.execute(
+            insert(table),
+            [
+                {owner.name: owner_id, "genre_id": ids[name]}
+                for owner_id, names in owner_genres.items()
+                for name in names
+            ],
+        )
+
+    db.session.execute(insert(Show), _shows(rng, shows, venues, artists, start))
+
+    summaries.refresh("venues")
+    summaries.refresh("artists")
+    db.session.commit()
+    return {"venues": venues, "artists": artists, "shows": shows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="Defaults to the app's database.")
+    parser.add_argument("--venues", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=1000)
+    parser.add_argument("--shows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        use_database(args.database_url)
+    with app.app_context():
+        counts = generate(args.venues, args.artists, args.shows, args.seed)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
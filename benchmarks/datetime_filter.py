@@ -0,0 +1,77 @@
+"""Throughput of the ``datetime`` template filter, before and after.
+
+The old filter parsed the string a view made of each show's start_time
+with dateutil and had Babel resolve the locale and pattern on every
+call. The current one formats the datetime it is handed with a pattern
+and locale resolved once per format. This times both over the same
+start times and checks that they render the same text.
+
+    python -m benchmarks.datetime_filter [--count N] [--repeat R]
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime
+
+
+def old_format_datetime(value, format="medium"):
+    """The filter as it was, fed str(start_time) by the views."""
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def per_second(function, values, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in values:
+            function(value, "full")
+        timings.append(time.perf_counter() - started)
+    return len(values) / statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime.datetime(2020, 1, 1, 19)
+    times = [
+        start + datetime.timedelta(days=rng.randint(0, 2000), minutes=rng.randint(0, 300))
+        for _ in range(args.count)
+    ]
+    strings = [str(value) for value in times]
+
+    mismatches = sum(
+        old_format_datetime(text, "full") != format_datetime(value, "full")
+        for text, value in zip(strings, times)
+    )
+    if mismatches:
+        raise SystemExit(f"{mismatches} start times render differently")
+
+    old = per_second(old_format_datetime, strings, args.repeat)
+    parsed = per_second(format_datetime, strings, args.repeat)
+    new = per_second(format_datetime, times, args.repeat)
+    print(f"{'filter':<28} {'calls/s':>10} {'speedup':>8}")
+    for label, rate in (
+        ("old, string input", old),
+        ("new, string input", parsed),
+        ("new, datetime input", new),
+    ):
+        print(f"{label:<28} {rate:>10.0f} {rate / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
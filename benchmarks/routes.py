@@ -0,0 +1,306 @@
+"""Latency, query count and memory of every route, through the test client.
+
+Seeds a synthetic catalog (see benchmarks.data), then requests each
+scenario below ``--repeat`` times and reports, per scenario, the median
+and 95th percentile latency, the most statements one request ran and
+the peak memory Python allocated while serving it (measured in a
+separate pass, as tracing allocations slows everything down).
+
+    python -m benchmarks.routes [--database-url URL] [--venues N] [--artists M]
+                                [--shows K] [--repeat R] [--cold]
+                                [--save FILE] [--compare FILE]
+
+``--save`` writes the results as JSON; ``--compare`` checks them against
+such a file and exits with status 1 if a scenario now runs more queries,
+or got slower or hungrier than ``--tolerance`` times its saved numbers.
+Routes of app.py without a scenario are listed, so new views get one.
+"""
+import argparse
+import collections
+import datetime
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import show_queue
+from app import app, cache
+from models import db, Venue, Show, Artist
+from benchmarks import data
+
+Scenario = collections.namedtuple("Scenario", "label endpoint method path options setup")
+
+_names = itertools.count(1)
+
+# Bookings the scenarios queue go here, not to the configured queue a
+# worker may be draining.
+QUEUE_PATH = os.path.join(tempfile.gettempdir(), "fyyur-bench-queue.db")
+
+
+def scenario(label, endpoint, path, method="GET", options=None, setup=None):
+    """A request of ``endpoint``.
+
+    ``options`` are test client keyword arguments, or a function of the
+    values ``setup`` returns building them; ``path`` is formatted with
+    those values too.
+    """
+    return Scenario(label, endpoint, method, path, options or {}, setup)
+
+
+def _form(**values):
+    return lambda ids: {"data": {"name": f"Bench {next(_names)}", **values}}
+
+
+def _json(**values):
+    return lambda ids: {"json": {"name": f"Bench {next(_names)}", **values}}
+
+
+def _venue_fields():
+    return dict(
+        city="San Francisco",
+        state="CA",
+        address="1 Bench St",
+        phone="555-0100",
+        genres=["Jazz", "Folk"],
+        facebook_link="https://www.facebook.com/bench",
+    )
+
+
+def _artist_fields():
+    return dict(
+        city="San Francisco",
+        state="CA",
+        phone="555-0100",
+        genres=["Jazz", "Folk"],
+        facebook_link="https://www.facebook.com/bench",
+    )
+
+
+def _show_fields():
+    # A day of its own after the generated shows, so it clashes with none.
+    start_time = datetime.datetime.now() + datetime.timedelta(
+        days=data.UPCOMING_DAYS + next(_names)
+    )
+    return {
+        "artist_id": 1,
+        "venue_id": 1,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def _throwaway_venue():
+    """Setup of the delete scenarios: a fresh venue with a show."""
+    venue = Venue(name=f"Bench {next(_names)}", city="Austin", state="TX",
+                  address="1 Bench St", phone="555-0100")
+    db.session.add(venue)
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=1, start_time=datetime.datetime.now()))
+    db.session.commit()
+    return {"id": venue.id}
+
+
+def _throwaway_artist():
+    artist = Artist(name=f"Bench {next(_names)}", city="Austin", state="TX",
+                    phone="555-0100")
+    db.session.add(artist)
+    db.session.flush()
+    db.session.add(Show(venue_id=1, artist_id=artist.id, start_time=datetime.datetime.now()))
+    db.session.commit()
+    return {"id": artist.id}
+
+
+def _queued_booking():
+    data = _show_fields()
+    data["start_time"] = datetime.datetime.strptime(data["start_time"], "%Y-%m-%d %H:%M:%S")
+    return {"id": show_queue.enqueue(data)}
+
+
+# The hot ids: the skewed generator gives venue 1 and artist 1 the most shows.
+SCENARIOS = [
+    scenario("home", "index", "/"),
+    scenario("venues", "venues", "/venues"),
+    scenario("venues ?state=CA", "venues", "/venues?state=CA"),
+    scenario("venue", "show_venue", "/venues/1"),
+    scenario("venue search", "search_venues", "/venues/search", "POST",
+             options={"data": {"search_term": "Venue 1"}}),
+    scenario("venue form", "create_venue_form", "/venues/create"),
+    scenario("venue create", "create_venue_submission", "/venues/create", "POST",
+             options=_form(**_venue_fields())),
+    scenario("venue edit form", "edit_venue", "/venues/1/edit"),
+    scenario("venue edit", "edit_venue_submission", "/venues/1/edit", "POST",
+             options=_form(**_venue_fields())),
+    scenario("venue delete", "delete_venue", "/venues/{id}/delete",
+             setup=_throwaway_venue),
+    scenario("artists", "artists", "/artists"),
+    scenario("artists ?state=CA", "artists", "/artists?state=CA"),
+    scenario("artist", "show_artist", "/artists/1"),
+    scenario("artist search", "search_artists", "/artists/search", "POST",
+             options={"data": {"search_term": "Artist 1"}}),
+    scenario("artist form", "create_artist_form", "/artists/create"),
+    scenario("artist create", "create_artist_submission", "/artists/create", "POST",
+             options=_form(**_artist_fields())),
+    scenario("artist edit form", "edit_artist", "/artists/1/edit"),
+    scenario("artist edit", "edit_artist_submission", "/artists/1/edit", "POST",
+             options=_form(**_artist_fields())),
+    scenario("artist delete", "delete_artist", "/artists/{id}/delete",
+             setup=_throwaway_artist),
+    scenario("shows", "shows", "/shows"),
+    scenario("show form", "create_shows", "/shows/create"),
+    scenario("show create", "create_show_submission", "/shows/create", "POST",
+             options=lambda ids: {"data": _show_fields()}),
+    scenario("export venues.csv", "export", "/export/venues.csv"),
+    scenario("export shows.jsonl", "export", "/export/shows.jsonl"),
+    scenario("api venues", "api.venue_list", "/api/v1/venues"),
+    scenario("api venue", "api.venue_detail", "/api/v1/venues/1"),
+    scenario("api venue search", "api.venue_search", "/api/v1/venues/search?q=Venue"),
+    scenario("api venue create", "api.venue_create", "/api/v1/venues", "POST",
+             options=_json(**_venue_fields())),
+    scenario("api artists", "api.artist_list", "/api/v1/artists"),
+    scenario("api artist", "api.artist_detail", "/api/v1/artists/1"),
+    scenario("api artist search", "api.artist_search", "/api/v1/artists/search?q=Artist"),
+    scenario("api artist create", "api.artist_create", "/api/v1/artists", "POST",
+             options=_json(**_artist_fields())),
+    scenario("api shows", "api.show_list", "/api/v1/shows"),
+    scenario("api show", "api.show_detail", "/api/v1/shows/1"),
+    scenario("api show search", "api.show_search", "/api/v1/shows/search?q=Venue 1"),
+    scenario("api show create", "api.show_create", "/api/v1/shows", "POST",
+             options=lambda ids: {"json": _show_fields()}),
+    scenario("api booking", "api.booking_detail", "/api/v1/bookings/{id}",
+             setup=_queued_booking),
+    scenario("healthz", "health.healthz", "/healthz"),
+    scenario("metrics", "health.metrics", "/metrics"),
+]
+
+# Served by Flask itself, not by app.py.
+UNBENCHMARKED = {"static"}
+
+
+def missing_endpoints():
+    """Endpoints of the app that no scenario requests."""
+    covered = {item.endpoint for item in SCENARIOS} | UNBENCHMARKED
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, "after_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def prepare(client, item, cold):
+    """Run ``item``'s setup; returns a function sending its request."""
+    ids = item.setup() if item.setup else {}
+    options = item.options(ids) if callable(item.options) else item.options
+    if cold:
+        cache.clear()
+    return lambda: client.open(item.path.format(**ids), method=item.method, **options)
+
+
+def measure(item, repeat, cold, counter):
+    client = app.test_client()
+    timings, queries = [], 0
+    for _ in range(repeat):
+        send = prepare(client, item, cold)
+        counter.count = 0
+        started = time.perf_counter()
+        response = send()
+        response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, counter.count)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{item.label}: {response.status_code}")
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(min(repeat, 3)):
+        send = prepare(client, item, cold)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        send().get_data()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": statistics.quantiles(timings, n=20)[-1] if repeat > 1 else timings[0],
+        "queries": queries,
+        "peak_kib": peak / 1024,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Lines describing each way ``results`` is worse than ``baseline``."""
+    found = []
+    for label, now in results.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        if now["queries"] > before["queries"]:
+            found.append(f"{label}: {before['queries']} -> {now['queries']} queries")
+        for key in ("p95_ms", "peak_kib"):
+            if now[key] > before[key] * tolerance:
+                found.append(f"{label}: {key} {before[key]:.1f} -> {now[key]:.1f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--venues", type=int, default=1000)
+    parser.add_argument("--artists", type=int, default=1000)
+    parser.add_argument("--shows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cold", action="store_true",
+                        help="Clear the read cache before every request.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Fail on regressions against this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    data.use_database(args.database_url)
+    app.config.update(
+        WTF_CSRF_ENABLED=False, SLOW_REQUEST_MS=sys.maxsize, SHOW_QUEUE_PATH=QUEUE_PATH
+    )
+    counter = QueryCounter()
+    results = {}
+
+    with app.app_context():
+        data.generate(args.venues, args.artists, args.shows, args.seed)
+        cache.clear()
+
+        print(f"{'scenario':<22} {'p50 ms':>8} {'p95 ms':>8} {'queries':>7} {'peak KiB':>9}")
+        for item in SCENARIOS:
+            result = results[item.label] = measure(item, args.repeat, args.cold, counter)
+            print(
+                f"{item.label:<22} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['queries']:>7} {result['peak_kib']:>9.1f}"
+            )
+
+    for endpoint in missing_endpoints():
+        print(f"no scenario for {endpoint}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            found = regressions(results, json.load(file), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Detail-page show queries as one artist/venue pair books more shows.
+
+Since shows got a surrogate key, a pair can play any number of times.
+This benchmark grows the number of shows for a single pair (on top of a
+fixed background of other bookings) and reports, per size, the median
+time of the venue and artist detail show queries and whether their plan
+stays index-backed.
+
+    python -m benchmarks.show_pairs [--database-url URL] [--sizes 1,10,100]
+"""
+import argparse
+import datetime
+import statistics
+import time
+
+from app import app
+from models import db, Venue, Show, Artist
+import explain
+import queries
+from benchmarks.data import use_database
+
+BACKGROUND_PAIRS = 200
+
+
+def seed(shows_per_pair):
+    db.drop_all()
+    db.create_all()
+
+    venues = [
+        Venue(name=f"Venue {i}", city="San Francisco", state="CA", address="1 Main St")
+        for i in range(BACKGROUND_PAIRS)
+    ]
+    artists = [
+        Artist(name=f"Artist {i}", city="San Francisco", state="CA", phone="555-0100")
+        for i in range(BACKGROUND_PAIRS)
+    ]
+    db.session.add_all(venues + artists)
+    db.session.flush()
+
+    start = datetime.datetime(2020, 1, 1, 20)
+    rows = [
+        {"artist_id": artist.id, "venue_id": venue.id, "start_time": start}
+        for venue, artist in zip(venues, artists)
+    ]
+    rows += [
+        {
+            "artist_id": artists[0].id,
+            "venue_id": venues[0].id,
+            "start_time": start + datetime.timedelta(days=day),
+        }
+        for day in range(1, shows_per_pair)
+    ]
+    db.session.bulk_insert_mappings(Show, rows)
+    db.session.commit()
+    return venues[0].id, artists[0].id
+
+
+def median_ms(build, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build().all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_database(args.database_url)
+
+    print(f"{'shows/pair':>10} {'venue ms':>9} {'artist ms':>9}  plan")
+    with app.app_context():
+        for size in (int(size) for size in args.sizes.split(",")):
+            venue_id, artist_id = seed(size)
+            checks = (
+                lambda: queries.venue_shows_query(venue_id),
+                lambda: queries.artist_shows_query(artist_id),
+            )
+            scanned = set()
+            for build in checks:
+                scanned |= explain.sequential_scans(explain.explain(build()))
+            plan = "index" if "shows" not in scanned else "SEQ SCAN on shows"
+            print(
+                f"{size:>10} {median_ms(checks[0], args.repeat):>9.3f} "
+                f"{median_ms(checks[1], args.repeat):>9.3f}  {plan}"
+            )
+
+
+if __name__ == "__main__":
+    main()
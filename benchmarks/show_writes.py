@@ -0,0 +1,90 @@
+"""A burst of show bookings, written in the request and queued.
+
+Posts the same ``--bookings`` shows to /api/v1/shows twice on a fresh
+catalog: once with SHOW_WRITES = "sync", where each request looks up the
+artist and venue, inserts, refreshes two summaries and commits, and once
+with "queued", where it only appends to the work table. For the queued
+run it also times the worker writing the queue to the database in
+batches, which is when the shows appear.
+
+    python -m benchmarks.show_writes [--database-url URL] [--bookings N]
+                                     [--batch-size B]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import show_queue
+from app import app, cache
+from models import db, Show
+from benchmarks import data, routes
+
+
+def bookings(count, venues, artists):
+    """Shows after the generated ones, a day apart per venue and per artist."""
+    start = datetime.datetime.now() + datetime.timedelta(days=data.UPCOMING_DAYS + 1)
+    return [
+        {
+            "artist_id": index % artists + 1,
+            "venue_id": index // artists % venues + 1,
+            "start_time": (start + datetime.timedelta(days=index)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+        }
+        for index in range(count)
+    ]
+
+
+def post_all(payloads, expected):
+    client = app.test_client()
+    started = time.perf_counter()
+    for payload in payloads:
+        response = client.post("/api/v1/shows", json=payload)
+        if response.status_code != expected:
+            raise RuntimeError(f"{payload}: {response.status_code}")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    data.use_database(args.database_url)
+    app.config.update(SLOW_REQUEST_MS=sys.maxsize, SHOW_QUEUE_PATH=routes.QUEUE_PATH)
+    payloads = bookings(args.bookings, 100, 100)
+    rows = []
+
+    with app.app_context():
+        data.generate(100, 100, 1000)
+        cache.clear()
+        app.config["SHOW_WRITES"] = "sync"
+        seconds = post_all(payloads, 201)
+        rows.append(("sync requests", seconds))
+
+        data.generate(100, 100, 1000)
+        cache.clear()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(routes.QUEUE_PATH + suffix):
+                os.remove(routes.QUEUE_PATH + suffix)
+        app.config["SHOW_WRITES"] = "queued"
+        rows.append(("queued requests", post_all(payloads, 202)))
+        before = db.session.query(Show).count()
+        started = time.perf_counter()
+        show_queue.run(args.batch_size, once=True, log=lambda line: None)
+        rows.append(("worker", time.perf_counter() - started))
+        written = db.session.query(Show).count() - before
+        if written != args.bookings:
+            raise SystemExit(f"the worker wrote {written} of {args.bookings} shows")
+
+    print(f"{'phase':<18} {'seconds':>8} {'bookings/s':>11}")
+    for label, seconds in rows:
+        print(f"{label:<18} {seconds:>8.2f} {args.bookings / seconds:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""Bulk import and export of venues, artists and shows.
+
+Files are streamed row by row (CSV with a header line, or JSON Lines),
+each row is validated with the same VenueForm/ArtistForm/ShowForm rules
+as the HTML forms, and accepted rows are written in batches of
+``batch_size``, one transaction per batch. PostgreSQL batches go through
+COPY; other databases use a single executemany per table. Each batch
+also rebuilds the summary rows it touched. Shows overlapping another
+show of their venue or artist, in the database or earlier in the file,
+are rejected (see conflicts.py). When the database refuses a batch, it
+is retried row by row and the refused rows are rejected: shows it
+finds booked or overlapping, venues and artists whose id is taken.
+
+Genres travel with their venue or artist: a JSON list, or a
+``;``-separated CSV cell. An optional ``id`` column keeps the given ids
+so that a later shows import can refer to them.
+
+Exports produce the same layout, with booleans as ``true``/``false``,
+so an export can be imported as is into an empty database. They read
+with server-side cursors (``yield_per``) and are generated chunk by
+chunk, so memory stays flat however many rows are exported and the
+first bytes go out as soon as the first chunk is read.
+"""
+import csv
+import io
+import itertools
+import json
+import time
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from werkzeug.datastructures import MultiDict
+
+import conflicts
+import summaries
+from forms import VenueForm, ArtistForm, ShowForm
+from genres import association, clean_names, genre_ids, genre_names
+from models import db, Venue, Show, Artist
+
+ENTITIES = ("venues", "artists", "shows")
+
+# form field -> model column, for the fields each model stores
+_COLUMNS = {
+    "venues": {
+        "name": "name",
+        "city": "city",
+        "state": "state",
+        "address": "address",
+        "phone": "phone",
+        "image_link": "image_link",
+        "facebook_link": "facebook_link",
+        "website_link": "website",
+        "seeking_talent": "seeking_talent",
+        "seeking_description": "seeking_description",
+    },
+    "artists": {
+        "name": "name",
+        "city": "city",
+        "state": "state",
+        "phone": "phone",
+        "image_link": "image_link",
+        "facebook_link": "facebook_link",
+        "seeking_venue": "seeking_venue",
+        "seeking_description": "seeking_description",
+    },
+}
+
+_FORMS = {"venues": VenueForm, "artists": ArtistForm, "shows": ShowForm}
+_MODELS = {"venues": Venue, "artists": Artist, "shows": Show}
+
+
+class ImportReport:
+    """Outcome of import_file(): counts, timing and the rejected rows."""
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        total = self.accepted + len(self.rejected)
+        return total / self.seconds if self.seconds else 0.0
+
+    def reject(self, line, row, errors):
+        self.rejected.append({"line": line, "row": row, "errors": errors})
+
+
+def read_rows(path, fmt=None):
+    """Yield ``(line_number, row_dict)`` from a CSV or JSONL file."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as file:
+        if fmt == "csv":
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                if row.get("genres"):
+                    row["genres"] = row["genres"].split(";")
+                yield line, row
+        else:
+            for line, text in enumerate(file, start=1):
+                if text.strip():
+                    yield line, json.loads(text)
+
+
+def _form_value(value):
+    """``value`` as a form posts it; BooleanField reads "false" as False."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def validate_row(entity, row):
+    """Run ``row`` through the entity's form; returns ``(data, errors)``."""
+    pairs = []
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        values = value if isinstance(value, list) else [value]
+        pairs.extend((key, _form_value(item)) for item in values)
+
+    form = _FORMS[entity](formdata=MultiDict(pairs), meta={"csrf": False})
+    if not form.validate():
+        return None, form.errors
+
+    data = form.data
+    errors = {}
+    for key in ("id", "artist_id", "venue_id") if entity == "shows" else ("id",):
+        if row.get(key) in (None, ""):
+            continue
+        try:
+            data[key] = int(row[key])
+        except (TypeError, ValueError):
+            errors[key] = ["Not a valid integer."]
+    if entity == "shows":
+        for key in ("artist_id", "venue_id"):
+            if key not in data or not isinstance(data[key], int):
+                errors.setdefault(key, ["This field is required."])
+    return (None, errors) if errors else (data, None)
+
+
+def model_values(entity, data):
+    """Map validated venue or artist form data onto model column values."""
+    return {
+        column: data[field]
+        for field, column in _COLUMNS[entity].items()
+        if data.get(field) is not None
+    }
+
+
+def import_file(entity, path, fmt=None, batch_size=1000):
+    """Validate and bulk insert every row of ``path``; returns ImportReport."""
+    report = ImportReport()
+    rows = read_rows(path, fmt)
+    while True:
+        batch = []
+        for line, row in itertools.islice(rows, batch_size):
+            data, errors = validate_row(entity, row)
+            if errors:
+                report.reject(line, row, errors)
+            else:
+                batch.append((line, row, data))
+        if not batch:
+            break
+        try:
+            if entity == "shows":
+                _book_shows(batch, report)
+            else:
+                _add_entities(entity, batch, report)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    if db.engine.dialect.name == "postgresql":
+        _sync_sequence(_MODELS[entity].__table__)
+        db.session.commit()
+    report.seconds = time.perf_counter() - report.started
+    return report
+
+
+def write_shows(items):
+    """Insert validated show rows, keyed by the caller, in one statement.
+
+    ``items`` are ``(key, data)`` pairs of validate_row() output. Returns
+    ``({key: show_id}, {key: errors})`` for the booked and the rejected
+    rows; the caller commits. The database numbers the shows, and one
+    lookup by artist, venue and start time finds their ids.
+    """
+    report = ImportReport()
+    _book_shows([(key, data, data) for key, data in items], report)
+    rejected = {item["line"]: item["errors"] for item in report.rejected}
+
+    slots = {
+        key: (data["artist_id"], data["venue_id"], data["start_time"])
+        for key, data in items
+        if key not in rejected
+    }
+    if not slots:
+        return {}, rejected
+    ids = {
+        (artist_id, venue_id, start_time): show_id
+        for show_id, artist_id, venue_id, start_time in db.session.execute(
+            select(Show.id, Show.artist_id, Show.venue_id, Show.start_time).where(
+                tuple_(Show.artist_id, Show.venue_id, Show.start_time).in_(slots.values())
+            )
+        )
+    }
+    return {key: ids[slot] for key, slot in slots.items()}, rejected
+
+
+def _add_entities(entity, batch, report):
+    """_write_entities(), retrying row by row if the database refuses the batch.
+
+    As _book_shows(): a row whose id is taken, in the database or earlier
+    in the file, is rejected instead of failing the rows around it.
+    """
+    try:
+        with db.session.begin_nested():
+            _write_entities(entity, batch)
+    except IntegrityError:
+        for line, row, data in batch:
+            try:
+                with db.session.begin_nested():
+                    _write_entities(entity, [(line, row, data)])
+            except IntegrityError:
+                report.reject(line, row, {"id": ["Id already in use."]})
+            else:
+                report.accepted += 1
+        return
+    report.accepted += len(batch)
+
+
+def _write_entities(entity, batch):
+    model = _MODELS[entity]
+    genre_table, owner = association(entity)
+    if db.engine.dialect.name == "postgresql":
+        # Ids imported explicitly do not move the sequence; nextval()
+        # would hand them out again.
+        _sync_sequence(model.__table__)
+    ids = _allocate_ids(model.__table__, sum(1 for _, _, data in batch if "id" not in data))
+    # One lookup (and at most one insert) resolves the whole batch's genres.
+    genres = genre_ids(genre for _, _, data in batch for genre in data["genres"])
+
+    rows = []
+    genre_rows = []
+    for _, _, data in batch:
+        entity_id = data["id"] if "id" in data else next(ids)
+        row = {"id": entity_id, **model_values(entity, data)}
+        rows.append(_with_defaults(model.__table__, row))
+        genre_rows.extend(
+            _with_defaults(genre_table, {owner.name: entity_id, "genre_id": genres[name]})
+            for name in clean_names(data["genres"])
+        )
+
+    _insert(model.__table__, rows)
+    _insert(genre_table, genre_rows)
+    summaries.refresh(entity, [row["id"] for row in rows])
+
+
+def _book_shows(batch, report):
+    """_write_shows(), retrying row by row if the database refuses the batch.
+
+    Each try runs on a savepoint, so a refused row (a show committed by
+    another writer since the check, or an overlap only an exclusion
+    constraint catches) is rejected with the reason instead of failing
+    the rows around it.
+    """
+    attempt = ImportReport()
+    try:
+        with db.session.begin_nested():
+            _write_shows(batch, attempt)
+    except IntegrityError:
+        for line, row, data in batch:
+            try:
+                with db.session.begin_nested():
+                    _write_shows([(line, row, data)], report)
+            except IntegrityError as error:
+                errors = conflicts.violation_errors(error, data["venue_id"], data["artist_id"])
+                report.reject(line, row, errors)
+        return
+    report.accepted += attempt.accepted
+    report.rejected.extend(attempt.rejected)
+
+
+def _write_shows(batch, report):
+    artist_ids = {data["artist_id"] for _, _, data in batch}
+    venue_ids = {data["venue_id"] for _, _, data in batch}
+    known_artists = set(db.session.scalars(select(Artist.id).where(Artist.id.in_(artist_ids))))
+    known_venues = set(db.session.scalars(select(Venue.id).where(Venue.id.in_(venue_ids))))
+    booked = set(
+        db.session.execute(
+            select(Show.artist_id, Show.venue_id, Show.start_time).where(
+                tuple_(Show.artist_id, Show.venue_id, Show.start_time).in_(
+                    [(d["artist_id"], d["venue_id"], d["start_time"]) for _, _, d in batch]
+                )
+            )
+        ).all()
+    )
+
+    schedule = conflicts.Schedule(
+        [(d["venue_id"], d["artist_id"], d["start_time"]) for _, _, d in batch]
+    )
+
+    rows = []
+    for line, row, data in batch:
+        key = (data["artist_id"], data["venue_id"], data["start_time"])
+        if data["artist_id"] not in known_artists:
+            report.reject(line, row, {"artist_id": ["No such artist."]})
+        elif data["venue_id"] not in known_venues:
+            report.reject(line, row, {"venue_id": ["No such venue."]})
+        elif key in booked:
+            report.reject(line, row, {"start_time": ["Show already booked."]})
+        else:
+            clashes = schedule.clashes(key[1], key[0], key[2])
+            if clashes:
+                report.reject(line, row, clashes)
+                continue
+            booked.add(key)
+            schedule.add(key[1], key[0], key[2])
+            show = {"artist_id": key[0], "venue_id": key[1], "start_time": key[2]}
+            if "id" in data:
+                show["id"] = data["id"]
+            rows.append(_with_defaults(Show.__table__, show))
+
+    _insert(Show.__table__, rows)
+    summaries.refresh("venues", {row["venue_id"] for row in rows})
+    summaries.refresh("artists", {row["artist_id"] for row in rows})
+    report.accepted += len(rows)
+
+
+def _with_defaults(table, row):
+    """Fill in scalar column defaults, which COPY would otherwise skip."""
+    for column in table.columns:
+        if column.name not in row and column.default is not None and column.default.is_scalar:
+            row[column.name] = column.default.arg
+    return row
+
+
+def _allocate_ids(table, count):
+    """Reserve ``count`` primary keys so genre rows can reference them."""
+    if count == 0:
+        return iter(())
+    if db.engine.dialect.name == "postgresql":
+        return iter(
+            db.session.scalars(
+                select(func.nextval(func.pg_get_serial_sequence(table.name, "id")))
+                .select_from(func.generate_series(1, count))
+            ).all()
+        )
+    # max(id) is read before the insert takes SQLite's write lock, so a
+    # concurrent insert can take these ids; the batch then fails with an
+    # IntegrityError and is retried row by row, each row reading max(id)
+    # again. Import when nothing else writes.
+    start = (db.session.scalar(select(func.max(table.c.id))) or 0) + 1
+    return iter(range(start, start + count))
+
+
+def _sync_sequence(table):
+    """Move the id sequence past ids that were imported explicitly."""
+    db.session.execute(
+        select(
+            func.setval(
+                func.pg_get_serial_sequence(table.name, "id"),
+                func.greatest(select(func.max(table.c.id)).scalar_subquery(), 1),
+            )
+        )
+    )
+
+
+def _insert(table, rows):
+    if not rows:
+        return
+    # Rows may carry different optional columns; group them so each
+    # statement has one column list.
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    connection = db.session.connection()
+    for columns, group in groups.items():
+        if connection.dialect.name == "postgresql":
+            _copy(connection, table, columns, group)
+        else:
+            connection.execute(table.insert(), group)
+
+
+def _copy(connection, table, columns, rows):
+    buffer = io.StringIO()
+    # QUOTE_NONNUMERIC writes None unquoted, which COPY reads as NULL,
+    # while empty strings stay quoted and are kept as ''.
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    buffer.seek(0)
+
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    dbapi = connection.dialect.dbapi
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except dbapi.Error as error:
+        # The raw cursor bypasses SQLAlchemy; raise what execute() would,
+        # e.g. IntegrityError for a constraint violation.
+        raise DBAPIError.instance(statement, None, error, dbapi.Error) from error
+    finally:
+        cursor.close()
+
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+_EXPORT_MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def export_columns(entity):
+    """Column names of ``entity``'s export, in order."""
+    if entity == "shows":
+        return ["id", "artist_id", "venue_id", "start_time"]
+    return ["id", *_COLUMNS[entity], "genres"]
+
+
+def export_rows(entity, chunk_size=1000):
+    """Yield lists of up to ``chunk_size`` export row dicts for ``entity``.
+
+    Genres of each chunk are fetched with one extra query.
+    """
+    model = _MODELS[entity]
+    if entity == "shows":
+        columns = [model.id, model.artist_id, model.venue_id, model.start_time]
+        names = export_columns(entity)
+    else:
+        columns = [model.id] + [getattr(model, column) for column in _COLUMNS[entity].values()]
+        names = ["id", *_COLUMNS[entity]]
+
+    result = db.session.execute(
+        select(*columns)
+        .order_by(model.id)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    for partition in result.partitions():
+        chunk = [dict(zip(names, row)) for row in partition]
+        if entity != "shows":
+            genres = genre_names(entity, [row["id"] for row in chunk])
+            for row in chunk:
+                row["genres"] = genres[row["id"]]
+        yield chunk
+
+
+def iter_export(entity, fmt="jsonl", chunk_size=1000):
+    """Yield ``entity`` serialized as CSV or JSONL text, one chunk at a time."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, export_columns(entity))
+        writer.writeheader()
+        yield buffer.getvalue()
+
+    for chunk in export_rows(entity, chunk_size):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            for row in chunk:
+                if "genres" in row:
+                    row["genres"] = ";".join(row["genres"])
+                writer.writerow({
+                    key: _form_value(value) if isinstance(value, bool) else value
+                    for key, value in row.items()
+                })
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
+
+
+def export_mimetype(fmt):
+    return _EXPORT_MIMETYPES[fmt]
@@ -0,0 +1,209 @@
+"""Read cache for the catalog views.
+
+Views cache the data they hand to their templates under keys built by
+cache_key(), e.g. ``view:show_venue:12``. Write handlers delete the keys
+they affect, so entries only expire on their own when nothing wrote to
+them within their TTL.
+
+Backends are picked with the CACHE_BACKEND setting:
+
+* ``lru`` (default): in-process, least-recently-used eviction capped at
+  CACHE_MAX_ENTRIES, entries expire after CACHE_DEFAULT_TTL seconds.
+* ``redis``: any Redis-compatible server at CACHE_REDIS_URL, shared by all
+  workers; needs the optional ``redis`` package.
+* ``null``: caches nothing.
+
+Entries showing upcoming/past splits are additionally clipped to the
+next show start they depend on (see Cache.get_or_set()), so they are
+reused as long as possible but never serve a show in the wrong bucket.
+Entries can also carry the version token of the page they were built
+for, and are rebuilt for a page at another version.
+
+Hit, miss, set and delete counters are kept per process; see Cache.stats().
+"""
+import collections
+import datetime
+import pickle
+import threading
+import time
+
+
+def cache_key(view, entity_id=None):
+    """Key for ``view``'s cached data, optionally scoped to one entity."""
+    if entity_id is None:
+        return f"view:{view}"
+    return f"view:{view}:{entity_id}"
+
+
+class LRUBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Redis-compatible backend; values are pickled."""
+
+    def __init__(self, url, prefix="fyyur:"):
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError(
+                "CACHE_BACKEND = 'redis' requires the redis package"
+            ) from error
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(
+            self.prefix + key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            px=max(1, int(ttl * 1000)),
+        )
+
+    def delete(self, keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class NullBackend:
+    """Caches nothing; every lookup is a miss."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class Cache:
+    """Facade over the configured backend with hit/miss counters.
+
+    ``None`` is never cached, so a view can return it for "not found"
+    without a later create being shadowed by a cached miss.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.default_ttl = 0
+        self._counters = collections.Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "lru")
+        app.config.setdefault("CACHE_DEFAULT_TTL", 300)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 1024)
+        app.config.setdefault("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+        backend = app.config["CACHE_BACKEND"]
+        if backend == "lru":
+            self.backend = LRUBackend(app.config["CACHE_MAX_ENTRIES"])
+        elif backend == "redis":
+            self.backend = RedisBackend(app.config["CACHE_REDIS_URL"])
+        elif backend == "null":
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"unknown CACHE_BACKEND {backend!r}")
+        self.default_ttl = app.config["CACHE_DEFAULT_TTL"]
+        app.extensions["cache"] = self
+
+    def get(self, key):
+        value = self.backend.get(key)
+        self._counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        if value is None:
+            return
+        self._counters["sets"] += 1
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+
+    def get_or_set(self, key, factory, ttl=None, expires_at=None, version=None):
+        """Return the cached value for ``key``, filling it from ``factory()``.
+
+        ``expires_at(value)`` may return the (naive, local) datetime at
+        which a freshly built value stops being correct, such as the start
+        of its next show; the entry's TTL is clipped to end there, and a
+        value already at its boundary is returned without being cached.
+
+        ``version`` is stored with the value, and an entry stored under
+        another version counts as a miss; None accepts any entry. Views
+        pass http_cache.page_version(), the token their ETag is built from.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and (version is None or entry[0] == version):
+            self._counters["hits"] += 1
+            return entry[1]
+        self._counters["misses"] += 1
+
+        value = factory()
+        if value is None:
+            return None
+        ttl = self.default_ttl if ttl is None else ttl
+        boundary = None if expires_at is None else expires_at(value)
+        if boundary is not None:
+            ttl = min(ttl, (boundary - datetime.datetime.now()).total_seconds())
+        if ttl > 0:
+            self.set(key, (version, value), ttl)
+        return value
+
+    def delete(self, *keys):
+        self._counters["deletes"] += len(keys)
+        self.backend.delete(keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Per-process counters: hits, misses, sets and deletes."""
+        return {
+            name: self._counters[name]
+            for name in ("hits", "misses", "sets", "deletes")
+        }
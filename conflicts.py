@@ -0,0 +1,210 @@
+"""Show scheduling conflicts.
+
+A show keeps its venue and its artist busy for SHOW_DURATION_MINUTES
+from its start_time, plus SHOW_BUFFER_MINUTES of changeover: its block.
+Two shows conflict when they share a venue or an artist and their blocks
+overlap. As every block is the same length, that is exactly when their
+start times are less than one block apart, so a check is a range scan of
+ix_shows_venue_id_start_time and ix_shows_artist_id_start_time rather
+than a look at each of the entity's shows.
+
+clashes() checks one booking with one statement, a range scan per
+side. Batches (imports, the show queue worker) use a Schedule: the shows
+near the batch's, loaded once into IntervalIndexes, which also take in
+each row the batch books.
+
+On PostgreSQL, exclusion constraints over each show's block (see
+migration 8d0f2b4c6e1a) also stop two concurrent bookings that both
+passed the check from both committing. They are built for a 150-minute
+block, CONSTRAINT_MINUTES, and the app refuses to start on PostgreSQL
+with any other configured block: the constraints would refuse bookings
+the check lets through, or let through clashes it refuses. Changing the
+block takes a migration that rebuilds the constraints. violation_errors()
+turns their refusals into the errors the check would have given.
+
+SQLite has no such constraint, and its single writer does not make the
+check safe: the check reads in a deferred transaction, before the
+insert takes the write lock, so two requests can both pass it and then
+both commit. Run SQLite with SHOW_WRITES = "queued", where one worker
+checks and writes every booking (see show_queue.py).
+"""
+import bisect
+import collections
+import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import make_url
+
+from models import db, Show
+
+
+def init_app(app):
+    app.config.setdefault("SHOW_DURATION_MINUTES", 120)
+    app.config.setdefault("SHOW_BUFFER_MINUTES", 30)
+    minutes = app.config["SHOW_DURATION_MINUTES"] + app.config["SHOW_BUFFER_MINUTES"]
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "postgresql" and minutes != CONSTRAINT_MINUTES:
+        raise RuntimeError(
+            f"SHOW_DURATION_MINUTES + SHOW_BUFFER_MINUTES is {minutes}, but the "
+            f"exclusion constraints on shows hold a {CONSTRAINT_MINUTES}-minute "
+            "block; add a migration rebuilding them and update "
+            "conflicts.CONSTRAINT_MINUTES"
+        )
+
+
+def block():
+    """How long a show keeps its venue and artist busy."""
+    config = current_app.config
+    return datetime.timedelta(
+        minutes=config["SHOW_DURATION_MINUTES"] + config["SHOW_BUFFER_MINUTES"]
+    )
+
+
+def _errors(venue_id, artist_id, venue_clash, artist_clash):
+    errors = {}
+    if venue_clash is not None:
+        errors["venue_id"] = [
+            f"Venue {venue_id} already has a show at {venue_clash:%Y-%m-%d %H:%M}."
+        ]
+    if artist_clash is not None:
+        errors["artist_id"] = [
+            f"Artist {artist_id} already has a show at {artist_clash:%Y-%m-%d %H:%M}."
+        ]
+    return errors
+
+
+# Migration 8d0f2b4c6e1a's exclusion constraints: the column each keeps
+# free, and the block they were built with.
+CONSTRAINTS = {"ex_shows_venue_id_block": "venue_id", "ex_shows_artist_id_block": "artist_id"}
+CONSTRAINT_MINUTES = 150
+
+
+def violation_errors(error, venue_id, artist_id):
+    """Form-style errors for the IntegrityError ``error`` of a show insert.
+
+    PostgreSQL names the constraint at fault: an exclusion constraint
+    means an overlap. Anything else is taken for the unique constraint on
+    the artist, venue and start time.
+    """
+    diag = getattr(error.orig, "diag", None)
+    column = CONSTRAINTS.get(getattr(diag, "constraint_name", None))
+    if column == "venue_id":
+        return {"venue_id": [
+            f"Venue {venue_id} already has a show less than "
+            f"{CONSTRAINT_MINUTES} minutes from this one."
+        ]}
+    if column == "artist_id":
+        return {"artist_id": [
+            f"Artist {artist_id} already has a show less than "
+            f"{CONSTRAINT_MINUTES} minutes from this one."
+        ]}
+    return {"start_time": ["Show already booked."]}
+
+
+def _first_start(column):
+    return (
+        select(Show.start_time)
+        .where(
+            column == bindparam(column.key),
+            Show.start_time > bindparam("low"),
+            Show.start_time < bindparam("high"),
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+# Built once, as it runs for every booking: the first start time within
+# a block of the booking's, of its venue and of its artist.
+_CLASHES = select(_first_start(Show.venue_id), _first_start(Show.artist_id))
+
+
+def clashes(venue_id, artist_id, start_time):
+    """Form-style errors if the booking overlaps another show; {} otherwise."""
+    length = block()
+    venue_clash, artist_clash = db.session.execute(
+        _CLASHES,
+        {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "low": start_time - length,
+            "high": start_time + length,
+        },
+    ).one()
+    return _errors(venue_id, artist_id, venue_clash, artist_clash)
+
+
+class IntervalIndex:
+    """Blocks of one length, found by where they overlap a given one.
+
+    Equal lengths make the start times alone an interval index: the
+    blocks overlapping the one starting at ``start`` are those starting
+    less than a length before or after it, two bisections of the sorted
+    starts.
+    """
+
+    def __init__(self, length, starts=()):
+        self.length = length
+        self._starts = sorted(starts)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, start):
+        bisect.insort(self._starts, start)
+
+    def overlapping(self, start):
+        """Starts of the blocks overlapping the one starting at ``start``."""
+        low = bisect.bisect_right(self._starts, start - self.length)
+        high = bisect.bisect_left(self._starts, start + self.length)
+        return self._starts[low:high]
+
+
+class Schedule:
+    """The shows near a batch of bookings, to check them in memory.
+
+    ``bookings`` are ``(venue_id, artist_id, start_time)`` tuples. Two
+    queries load the start times of the shows of their venues and of
+    their artists, between the first block and the last.
+    """
+
+    def __init__(self, bookings):
+        self.length = block()
+        self.venues = collections.defaultdict(lambda: IntervalIndex(self.length))
+        self.artists = collections.defaultdict(lambda: IntervalIndex(self.length))
+        if not bookings:
+            return
+
+        starts = [start_time for _, _, start_time in bookings]
+        window = (
+            Show.start_time > min(starts) - self.length,
+            Show.start_time < max(starts) + self.length,
+        )
+        for column, ids, index in (
+            (Show.venue_id, {venue_id for venue_id, _, _ in bookings}, self.venues),
+            (Show.artist_id, {artist_id for _, artist_id, _ in bookings}, self.artists),
+        ):
+            shows = collections.defaultdict(list)
+            for owner, start_time in db.session.execute(
+                select(column, Show.start_time).where(column.in_(ids), *window)
+            ):
+                shows[owner].append(start_time)
+            for owner, owner_starts in shows.items():
+                index[owner] = IntervalIndex(self.length, owner_starts)
+
+    def clashes(self, venue_id, artist_id, start_time):
+        """Form-style errors, as from the module's clashes()."""
+        venue_clash = self.venues[venue_id].overlapping(start_time)
+        artist_clash = self.artists[artist_id].overlapping(start_time)
+        return _errors(
+            venue_id,
+            artist_id,
+            venue_clash[0] if venue_clash else None,
+            artist_clash[0] if artist_clash else None,
+        )
+
+    def add(self, venue_id, artist_id, start_time):
+        """Count a booking of the batch in, for the rows after it."""
+        self.venues[venue_id].add(start_time)
+        self.artists[artist_id].add(start_time)
@@ -0,0 +1,88 @@
+"""EXPLAIN-based check that each view's main query is index-backed.
+
+Every entry in VIEW_QUERIES builds the statement a view runs and names
+the tables that must not be read with a sequential scan. check_views()
+runs EXPLAIN (PostgreSQL) or EXPLAIN QUERY PLAN (SQLite) on each one
+against the current database; ``flask explain-views`` reports the plans
+and fails if any table is scanned sequentially. Small tables are cheaper
+to scan than to index, so run it on a seeded dataset, not an empty one.
+"""
+import re
+
+from models import db
+import queries
+import search
+
+VIEW_QUERIES = {
+    # Unfiltered, the listing reads every summary row and a scan is
+    # right; narrowed to a genre, it must look both tables up by index.
+    "venues": (
+        lambda ids: queries.venue_listing_query(genre=ids["genre"]),
+        ("venue_genres", "venue_summaries"),
+    ),
+    "show_venue": (
+        lambda ids: queries.venue_shows_query(ids["venue_id"]),
+        ("shows",),
+    ),
+    "show_artist": (
+        lambda ids: queries.artist_shows_query(ids["artist_id"]),
+        ("shows",),
+    ),
+    "shows": (lambda ids: queries.shows_query("upcoming"), ("shows",)),
+    "search_venues": (
+        lambda ids: search.search_query("venues", ids["term"]),
+        ("venues",),
+    ),
+    "search_artists": (
+        lambda ids: search.search_query("artists", ids["term"]),
+        ("artists",),
+    ),
+}
+
+_SEQUENTIAL_SCAN = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$"),
+}
+
+
+def explain(statement):
+    """Return the query plan of ``statement`` as a list of text lines."""
+    statement = getattr(statement, "statement", statement)
+    dialect = db.engine.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    connection = db.session.connection()
+    rows = connection.exec_driver_sql(prefix + str(compiled), params).all()
+
+    if dialect.name == "sqlite":
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def sequential_scans(plan):
+    """Names of the tables read by a sequential scan in ``plan``."""
+    pattern = _SEQUENTIAL_SCAN[db.engine.dialect.name]
+    tables = set()
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            tables.add(match.group(1))
+    return tables
+
+
+def check_view(view, ids):
+    """Explain one view query; returns ``(plan, offending_tables)``."""
+    build, indexed_tables = VIEW_QUERIES[view]
+    plan = explain(build(ids))
+    return plan, sequential_scans(plan) & set(indexed_tables)
+
+
+def check_views(venue_id, artist_id, term="music", genre="Jazz"):
+    """Explain every view query; yields ``(view, plan, offending_tables)``."""
+    ids = {"venue_id": venue_id, "artist_id": artist_id, "term": term, "genre": genre}
+    for view in VIEW_QUERIES:
+        yield (view, *check_view(view, ids))
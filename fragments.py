@@ -0,0 +1,114 @@
+"""Rendered-fragment cache for the templates.
+
+A ``{% cache %}`` block renders its body once per key and reuses the
+markup afterwards::
+
+    {% cache venue.id, venue.version %}
+      ... tile markup ...
+    {% endcache %}
+
+Keys are the block's own position in its template plus the values given,
+which must determine everything the body renders: an entity's id and a
+version that changes whenever it does (an updated_at or refreshed_at
+column). Entries are never invalidated; a new version just makes a new
+key, and the stale one ages out.
+
+Fragments live in process memory, least recently used first out once
+their total size passes FRAGMENT_CACHE_MAX_BYTES; 0 disables caching.
+"""
+import collections
+import itertools
+import sys
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+# Tells apart blocks (and compilations of an edited template) that are
+# handed the same values.
+_blocks = itertools.count()
+
+
+class FragmentCache:
+    """Size-capped LRU of rendered fragments."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+
+    def get(self, key):
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return markup
+
+    def set(self, key, markup):
+        size = sys.getsizeof(markup)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= sys.getsizeof(previous)
+            self._entries[key] = markup
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Per-process counters: hits, misses and evictions."""
+        return {
+            name: self._counters[name] for name in ("hits", "misses", "evictions")
+        }
+
+
+class FragmentCacheExtension(Extension):
+    """The ``{% cache key, ... %}...{% endcache %}`` tag."""
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [nodes.Const(next(_blocks))]
+        parts.append(parser.parse_expression())
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.Tuple(parts, "load")]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        markup = cache.get(key)
+        if markup is None:
+            markup = caller()
+            cache.set(key, markup)
+        return markup
+
+
+def init_app(app):
+    app.config.setdefault("FRAGMENT_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    max_bytes = app.config["FRAGMENT_CACHE_MAX_BYTES"]
+    app.jinja_env.fragment_cache = FragmentCache(max_bytes) if max_bytes else None
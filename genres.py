@@ -0,0 +1,113 @@
+"""Genre lookups and genre set writes.
+
+Each genre name is stored once in ``genres``; venues and artists refer
+to it by id through the ``venue_genres`` and ``artist_genres``
+association tables, so genre filters join on integer keys.
+"""
+import datetime
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql
+
+from models import db, Genre, Venue_Genre, Venue, Artist_Genre, Artist
+
+# entity -> (owner model, association table, owner column name)
+_ASSOCIATIONS = {
+    "venues": (Venue, Venue_Genre.__table__, "venue_id"),
+    "artists": (Artist, Artist_Genre.__table__, "artist_id"),
+}
+
+
+def association(entity):
+    """``(association_table, owner_column)`` of "venues" or "artists"."""
+    _, table, owner = _ASSOCIATIONS[entity]
+    return table, table.c[owner]
+
+
+def clean_names(names):
+    """The distinct, stripped, non-blank names among ``names``."""
+    return {name.strip() for name in names if name and name.strip()}
+
+
+def _insert_missing(names):
+    table = Genre.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(table).on_conflict_do_nothing(
+            index_elements=["name"]
+        )
+    elif dialect == "sqlite":
+        statement = insert(table).prefix_with("OR IGNORE")
+    else:
+        statement = insert(table)
+    # Sorted, so concurrent writers take the unique index locks in order.
+    db.session.execute(statement, [{"name": name} for name in sorted(names)])
+
+
+def genre_ids(names):
+    """Map genre names to ids, adding the missing names in one insert."""
+    names = clean_names(names)
+    if not names:
+        return {}
+
+    lookup = select(Genre.name, Genre.id)
+    ids = dict(db.session.execute(lookup.where(Genre.name.in_(names))).all())
+    missing = names - ids.keys()
+    if missing:
+        _insert_missing(missing)
+        ids.update(db.session.execute(lookup.where(Genre.name.in_(missing))).all())
+    return ids
+
+
+def genre_names(entity, owner_ids):
+    """``{owner_id: [name, ...]}`` for the given venues or artists."""
+    table, owner = association(entity)
+    names = {owner_id: [] for owner_id in owner_ids}
+    if not names:
+        return names
+    for owner_id, name in db.session.execute(
+        select(owner, Genre.name)
+        .join(Genre, Genre.id == table.c.genre_id)
+        .where(owner.in_(names))
+        .order_by(owner, Genre.name)
+    ):
+        names[owner_id].append(name)
+    return names
+
+
+def set_genres(entity, owner_id, names, touch=True):
+    """Make ``names`` the genres of venue or artist ``owner_id``.
+
+    Only the difference with the stored set is written: one DELETE for
+    the genres dropped and one multi-row INSERT for those added. With
+    ``touch``, a change also bumps the owner's updated_at, which column
+    edits alone would miss. Returns True if anything changed.
+    """
+    model, table, owner = _ASSOCIATIONS[entity]
+    wanted = set(genre_ids(names).values())
+    current = set(
+        db.session.scalars(
+            select(table.c.genre_id).where(table.c[owner] == owner_id)
+        )
+    )
+
+    removed = current - wanted
+    added = wanted - current
+    if removed:
+        db.session.execute(
+            delete(table).where(
+                table.c[owner] == owner_id, table.c.genre_id.in_(removed)
+            )
+        )
+    if added:
+        db.session.execute(
+            insert(table),
+            [{owner: owner_id, "genre_id": genre_id} for genre_id in sorted(added)],
+        )
+    if touch and (removed or added):
+        db.session.execute(
+            update(model.__table__)
+            .where(model.__table__.c.id == owner_id)
+            .values(updated_at=datetime.datetime.now())
+        )
+    return bool(removed or added)
@@ -0,0 +1,116 @@
+"""Health and metrics endpoints.
+
+``/healthz`` runs ``SELECT 1`` and answers 200, or 503 when the database
+cannot be reached. ``/metrics`` reports the connection pool, the read
+cache and the fragment cache in the Prometheus text format.
+
+The PostgreSQL engine is built with InstrumentedQueuePool (see
+init_app()), which times every checkout, so a pool too small for the
+workers' concurrency shows up as wait time and timeouts well before
+requests start failing.
+"""
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+health = Blueprint("health", __name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts checkouts and the time spent waiting for them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def init_app(app):
+    """Register the endpoints and instrument the PostgreSQL pool."""
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": InstrumentedQueuePool,
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+    app.register_blueprint(health)
+
+
+def pool_stats():
+    """Current numbers of the engine's pool; empty for non-queue pools."""
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts_total=pool.checkouts,
+            timeouts_total=pool.timeouts,
+            wait_seconds_total=pool.wait_seconds,
+            wait_seconds_max=pool.max_wait_seconds,
+        )
+    return stats
+
+
+@health.route("/healthz")
+def healthz():
+    started = time.perf_counter()
+    try:
+        # Straight on the engine: the session could be reading from a replica.
+        with db.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except exc.SQLAlchemyError as error:
+        return jsonify(status="error", database=str(error.__class__.__name__)), 503
+    latency_ms = (time.perf_counter() - started) * 1000
+    return jsonify(status="ok", database="ok", latency_ms=round(latency_ms, 2))
+
+
+@health.route("/metrics")
+def metrics():
+    lines = []
+
+    def metric(name, value, kind="gauge"):
+        lines.append(f"# TYPE fyyur_{name} {kind}")
+        lines.append(f"fyyur_{name} {value}")
+
+    for name, value in pool_stats().items():
+        metric(f"db_pool_{name}", value, "counter" if name.endswith("_total") else "gauge")
+    for name, value in current_app.extensions["cache"].stats().items():
+        metric(f"cache_{name}_total", value, "counter")
+    fragment_cache = current_app.jinja_env.fragment_cache
+    if fragment_cache is not None:
+        for name, value in fragment_cache.stats().items():
+            metric(f"fragment_cache_{name}_total", value, "counter")
+        metric("fragment_cache_bytes", fragment_cache.size)
+
+    return current_app.response_class(
+        "\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,112 @@
+"""Conditional GET for the read pages.
+
+``@conditional(version)`` asks ``version(**view_args)`` for the page's
+``(token, last_modified)`` (see the page versions in queries.py) before
+the view runs. The ETag is a hash of that token plus the templates'
+modification times, so a deploy with new templates also changes it. A
+request whose If-None-Match matches gets a 304 without the view or its
+templates running; otherwise the rendered page goes out with ETag,
+Last-Modified and Cache-Control (``public``, HTTP_CACHE_MAX_AGE seconds,
+then revalidate).
+
+Deleting a row does not move any updated_at, so Last-Modified can lag
+behind a deletion; If-None-Match is the validator that decides, and
+If-Modified-Since alone never yields a 304.
+
+Pages carrying flashed messages are per-visitor and are sent with
+``Cache-Control: no-store`` and no validators.
+
+The view's data may come from the read cache, which with the in-process
+LRU backend misses the deletes other workers make. Views pass
+page_version() to Cache.get_or_set(), which rebuilds an entry stored
+under another token, so a body is never older than the ETag it is sent
+with.
+"""
+import functools
+import hashlib
+import os
+
+from flask import current_app, g, make_response, request, session
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db
+
+
+@functools.lru_cache(maxsize=None)
+def _templates_stamp(folder):
+    return max(
+        (
+            os.path.getmtime(os.path.join(root, name))
+            for root, _, names in os.walk(folder)
+            for name in names
+        ),
+        default=0,
+    )
+
+
+def page_etag(token):
+    folder = os.path.join(current_app.root_path, current_app.template_folder)
+    digest = hashlib.sha1(repr((_templates_stamp(folder), token)).encode())
+    return digest.hexdigest()
+
+
+def page_version():
+    """The token conditional() validated the current request with, or None."""
+    return g.get("page_version")
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        # Stored times are naive local time; werkzeug assumes naive is UTC.
+        response.last_modified = last_modified.astimezone()
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["HTTP_CACHE_MAX_AGE"]
+    response.cache_control.must_revalidate = True
+    return response
+
+
+def _uncacheable(response):
+    response.cache_control.no_store = True
+    return response
+
+
+def conditional(version):
+    """Answer GETs of the decorated view with 304 while ``version`` holds.
+
+    ``version(**view_args)`` returns ``(token, last_modified)``, or None
+    when there is nothing to validate (e.g. the entity does not exist),
+    in which case the view runs as usual.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            if "_flashes" in session:
+                return _uncacheable(make_response(view(**view_args)))
+
+            try:
+                current = version(**view_args)
+            except SQLAlchemyError:
+                db.session.rollback()
+                current = None
+            if current is None:
+                return make_response(view(**view_args))
+
+            token, last_modified = current
+            g.page_version = token
+            etag = page_etag(token)
+            if request.if_none_match.contains(etag):
+                return _set_validators(
+                    current_app.response_class(status=304), etag, last_modified
+                )
+
+            response = make_response(view(**view_args))
+            if "_flashes" in session:
+                return _uncacheable(response)
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,126 @@
+"""Per-request SQL instrumentation.
+
+Engine events time every statement a request runs, on the primary and
+on the replicas alike. Each response gets a Server-Timing header with
+the request's query count and database time, which browser dev tools
+show next to the request, and requests slower than SLOW_REQUEST_MS are
+logged with their route and their costliest statements.
+
+Statements are grouped by fingerprint: the SQL with literals and bound
+parameters replaced by ``?`` and IN lists collapsed, so the queries of
+an N+1 loop add up to one line instead of N.
+"""
+import re
+import time
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements listed per slow request.
+SLOW_STATEMENTS = 5
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+")
+_PARAMETER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def fingerprint(statement):
+    """``statement`` with its literals and parameters replaced by ``?``."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _PLACEHOLDERS.sub("?", statement)
+    statement = _PARAMETER_LISTS.sub("(...)", statement)
+    return " ".join(statement.split())
+
+
+class RequestStats:
+    """Statements run by one request, totalled per fingerprint."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = {}
+        self.status = None
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.seconds += seconds
+        totals = self.statements.setdefault(fingerprint(statement), [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    def slowest(self, limit=SLOW_STATEMENTS):
+        """``(fingerprint, count, seconds)`` of the costliest statements."""
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][1])
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+def _stats():
+    return g.get("sql_stats") if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(context):
+    # after_cursor_execute does not run for failed statements.
+    if context.connection is not None:
+        context.connection.info.get("query_started", [None]).pop()
+
+
+def init_app(app):
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_server_timing)
+    app.teardown_request(_log_slow_request)
+
+
+def _start_request():
+    g.sql_stats = RequestStats()
+
+
+def _server_timing(response):
+    stats = _stats()
+    if stats is None:
+        return response
+    stats.status = response.status_code
+    if current_app.config["SERVER_TIMING"]:
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f"total;dur={total_ms:.1f}",
+        )
+    return response
+
+
+def _log_slow_request(error):
+    # Teardown runs after streamed responses finish, so their queries count.
+    stats = _stats()
+    if stats is None:
+        return
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    if total_ms < current_app.config["SLOW_REQUEST_MS"]:
+        return
+
+    lines = [
+        f"slow request {request.method} {request.path} "
+        f"({request.endpoint}) {stats.status or 500} in {total_ms:.0f} ms: "
+        f"{stats.queries} queries, {stats.seconds * 1000:.0f} ms in the database"
+    ]
+    for sql, count, seconds in stats.slowest():
+        lines.append(f"  {count}x {seconds * 1000:.1f} ms {sql[:500]}")
+    current_app.logger.warning("\n".join(lines))
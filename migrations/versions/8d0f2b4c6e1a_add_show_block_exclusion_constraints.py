@@ -0,0 +1,63 @@
+"""Exclude overlapping shows per venue and per artist
+
+Revision ID: 8d0f2b4c6e1a
+Revises: a7c9e1f3b5d6
+Create Date: 2026-10-18 21:07:45.183920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d0f2b4c6e1a'
+down_revision = 'a7c9e1f3b5d6'
+branch_labels = None
+depends_on = None
+
+# SHOW_DURATION_MINUTES + SHOW_BUFFER_MINUTES, as conflicts.CONSTRAINT_MINUTES:
+# the app will not start on PostgreSQL with another block. conflicts.py
+# checks the block before inserting and reports what these constraints
+# refuse as clashes.
+BLOCK = "interval '150 minutes'"
+
+# start_time is a timestamp without time zone, hence tsrange: tstzrange
+# of it would depend on the session's TimeZone, which an index may not.
+CONSTRAINTS = {
+    'ex_shows_venue_id_block': 'venue_id',
+    'ex_shows_artist_id_block': 'artist_id',
+}
+
+
+def upgrade():
+    # SQLite has no exclusion constraints; the checks in conflicts.py
+    # are all there is.
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in CONSTRAINTS.items():
+        # Name the problem rather than let the ALTER fail on it (not
+        # possible when only generating SQL with --sql).
+        overlapping = not op.get_context().as_sql and op.get_bind().execute(sa.text(
+            f'SELECT count(*) FROM shows a JOIN shows b '
+            f'ON b.{column} = a.{column} AND b.id <> a.id '
+            f'AND b.start_time >= a.start_time AND b.start_time < a.start_time + {BLOCK}'
+        )).scalar()
+        if overlapping:
+            raise RuntimeError(
+                f'{overlapping} pairs of shows overlap on {column}; move or delete '
+                f'them before adding {name}'
+            )
+        op.execute(
+            f'ALTER TABLE shows ADD CONSTRAINT {name} EXCLUDE USING gist '
+            f'({column} WITH =, tsrange(start_time, start_time + {BLOCK}) WITH &&)'
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    for name in reversed(list(CONSTRAINTS)):
+        op.drop_constraint(name, 'shows')
@@ -0,0 +1,66 @@
+"""Add venue and artist summary tables
+
+Revision ID: a7c9e1f3b5d6
+Revises: f6b8d0e2c4a5
+Create Date: 2026-10-18 15:41:52.664310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c9e1f3b5d6'
+down_revision = 'f6b8d0e2c4a5'
+branch_labels = None
+depends_on = None
+
+# summary table -> owner table, owner column, genre table, name type
+SUMMARIES = {
+    'venue_summaries': ('venues', 'venue_id', 'venue_genres', sa.String()),
+    'artist_summaries': ('artists', 'artist_id', 'artist_genres', sa.String(length=120)),
+}
+
+
+def upgrade():
+    for table, (owner_table, owner, genre_table, name_type) in SUMMARIES.items():
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', name_type, nullable=False),
+        sa.Column('city', sa.String(length=120), nullable=False),
+        sa.Column('state', sa.String(length=120), nullable=False),
+        sa.Column('genres', sa.String(), nullable=False),
+        sa.Column('num_upcoming_shows', sa.Integer(), nullable=False),
+        sa.Column('num_past_shows', sa.Integer(), nullable=False),
+        sa.Column('next_show_at', sa.DateTime(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], [f'{owner_table}.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(f'ix_{table}_next_show_at', table, ['next_show_at'])
+
+        # Same rows as summaries.refresh(), computed once for everything.
+        op.execute(
+            f"INSERT INTO {table} (id, name, city, state, genres, num_upcoming_shows, "
+            f"num_past_shows, next_show_at, refreshed_at) "
+            f"SELECT o.id, o.name, o.city, o.state, "
+            f"coalesce((SELECT string_agg(g.name, ', ' ORDER BY g.name) "
+            f"FROM genres g JOIN {genre_table} a ON a.genre_id = g.id "
+            f"WHERE a.{owner} = o.id), ''), "
+            f"(SELECT count(*) FROM shows s WHERE s.{owner} = o.id AND s.start_time > now()), "
+            f"(SELECT count(*) FROM shows s WHERE s.{owner} = o.id AND s.start_time <= now()), "
+            f"(SELECT min(s.start_time) FROM shows s WHERE s.{owner} = o.id AND s.start_time > now()), "
+            f"now() "
+            f"FROM {owner_table} o"
+        )
+
+    op.create_index(
+        'ix_venue_summaries_city_state_id', 'venue_summaries', ['city', 'state', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_venue_summaries_city_state_id', table_name='venue_summaries')
+    for table in reversed(list(SUMMARIES)):
+        op.drop_index(f'ix_{table}_next_show_at', table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,56 @@
+"""Add trigram and full-text search indexes
+
+Revision ID: b7d1f0c2a9e4
+Revises: 5c488e965342
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1f0c2a9e4'
+down_revision = '5c488e965342'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_venues_name_trgm', 'venues', 'name'),
+    ('ix_venues_city_trgm', 'venues', 'city'),
+    ('ix_artists_name_trgm', 'artists', 'name'),
+    ('ix_artists_city_trgm', 'artists', 'city'),
+    ('ix_venue_genres_genre_trgm', 'venue_genres', 'genre'),
+    ('ix_artist_genres_genre_trgm', 'artist_genres', 'genre'),
+]
+
+# Must stay identical to search._document() for the planner to use it.
+DOCUMENT = "to_tsvector('simple', name || ' ' || city || ' ' || state)"
+
+
+def upgrade():
+    # The SQLite fallback builds its FTS5 tables at create_all() time.
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name, table, [sa.text(f'{column} gin_trgm_ops')],
+            postgresql_using='gin',
+        )
+    for table in ('venues', 'artists'):
+        op.create_index(
+            f'ix_{table}_search_document', table, [sa.text(DOCUMENT)],
+            postgresql_using='gin',
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    for table in ('artists', 'venues'):
+        op.drop_index(f'ix_{table}_search_document', table_name=table)
+    for name, table, column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
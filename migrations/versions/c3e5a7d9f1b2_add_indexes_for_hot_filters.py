@@ -0,0 +1,35 @@
+"""Add indexes for the filters used by the listing and detail views
+
+Revision ID: c3e5a7d9f1b2
+Revises: b7d1f0c2a9e4
+Create Date: 2026-10-18 10:03:47.219054
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7d9f1b2'
+down_revision = 'b7d1f0c2a9e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # shows.venue_id on its own is served by the leading column of
+    # ix_shows_venue_id_start_time, so it gets no separate index.
+    op.create_index('ix_shows_start_time', 'shows', ['start_time'], unique=False)
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_venue_genres_venue_id', 'venue_genres', ['venue_id'], unique=False)
+    op.create_index('ix_artist_genres_artist_id', 'artist_genres', ['artist_id'], unique=False)
+    op.create_index('ix_venues_city_state', 'venues', ['city', 'state'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venues_city_state', table_name='venues')
+    op.drop_index('ix_artist_genres_artist_id', table_name='artist_genres')
+    op.drop_index('ix_venue_genres_venue_id', table_name='venue_genres')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_start_time', table_name='shows')
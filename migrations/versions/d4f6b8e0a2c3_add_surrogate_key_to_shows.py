@@ -0,0 +1,39 @@
+"""Give shows a surrogate key so a pair can play more than once
+
+Revision ID: d4f6b8e0a2c3
+Revises: c3e5a7d9f1b2
+Create Date: 2026-10-18 11:26:05.771830
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8e0a2c3'
+down_revision = 'c3e5a7d9f1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_constraint('shows_pkey', 'shows', type_='primary')
+    # SERIAL backfills existing rows while adding the column.
+    op.execute('ALTER TABLE shows ADD COLUMN id SERIAL NOT NULL')
+    op.create_primary_key('shows_pkey', 'shows', ['id'])
+    op.create_unique_constraint(
+        'uq_shows_artist_id_venue_id_start_time', 'shows',
+        ['artist_id', 'venue_id', 'start_time'],
+    )
+
+
+def downgrade():
+    # The composite key allows one show per pair: keep the earliest booked.
+    op.execute(
+        'DELETE FROM shows s USING shows t '
+        'WHERE s.artist_id = t.artist_id AND s.venue_id = t.venue_id '
+        'AND s.id > t.id'
+    )
+    op.drop_constraint('uq_shows_artist_id_venue_id_start_time', 'shows', type_='unique')
+    op.drop_constraint('shows_pkey', 'shows', type_='primary')
+    op.drop_column('shows', 'id')
+    op.create_primary_key('shows_pkey', 'shows', ['artist_id', 'venue_id'])
@@ -0,0 +1,33 @@
+"""Add updated_at to venues, artists and shows
+
+Revision ID: e5a7c9d1b3f4
+Revises: d4f6b8e0a2c3
+Create Date: 2026-10-18 13:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d1b3f4'
+down_revision = 'd4f6b8e0a2c3'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows')
+
+
+def upgrade():
+    for table in TABLES:
+        # The server default backfills existing rows and covers COPY imports.
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False,
+        ))
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,104 @@
+"""Normalize genres into a lookup table
+
+Revision ID: f6b8d0e2c4a5
+Revises: e5a7c9d1b3f4
+Create Date: 2026-10-18 14:20:09.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e2c4a5'
+down_revision = 'e5a7c9d1b3f4'
+branch_labels = None
+depends_on = None
+
+# association table -> owner column, owner table
+ASSOCIATIONS = {
+    'venue_genres': ('venue_id', 'venues'),
+    'artist_genres': ('artist_id', 'artists'),
+}
+
+
+def upgrade():
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', name='uq_genres_name')
+    )
+    op.execute(
+        "INSERT INTO genres (name) "
+        "SELECT DISTINCT btrim(genre) FROM ("
+        "SELECT genre FROM venue_genres UNION SELECT genre FROM artist_genres"
+        ") g WHERE btrim(genre) <> '' ORDER BY 1"
+    )
+
+    for table, (owner, owner_table) in ASSOCIATIONS.items():
+        op.add_column(table, sa.Column('genre_id', sa.Integer(), nullable=True))
+        op.execute(
+            f"UPDATE {table} t SET genre_id = g.id FROM genres g "
+            f"WHERE g.name = btrim(t.genre)"
+        )
+        # Blank genres have nothing to point at; repeated (owner, genre)
+        # rows collapse onto the one with the lowest id.
+        op.execute(f"DELETE FROM {table} WHERE genre_id IS NULL")
+        op.execute(
+            f"DELETE FROM {table} a USING {table} b "
+            f"WHERE a.{owner} = b.{owner} AND a.genre_id = b.genre_id AND a.id > b.id"
+        )
+
+        op.drop_index(f'ix_{table}_{owner}', table_name=table)
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.drop_constraint(f'{table}_{owner}_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'id')
+        op.drop_column(table, 'genre')
+        op.alter_column(table, 'genre_id', nullable=False)
+        op.create_primary_key(f'{table}_pkey', table, [owner, 'genre_id'])
+        op.create_foreign_key(
+            f'{table}_{owner}_fkey', table, owner_table, [owner], ['id'],
+            ondelete='CASCADE',
+        )
+        op.create_foreign_key(
+            f'{table}_genre_id_fkey', table, 'genres', ['genre_id'], ['id'],
+        )
+        op.create_index(f'ix_{table}_genre_id', table, ['genre_id'])
+
+    # Replaces the trigram indexes that went with the genre columns.
+    op.create_index(
+        'ix_genres_name_trgm', 'genres', [sa.text('name gin_trgm_ops')],
+        postgresql_using='gin',
+    )
+
+
+def downgrade():
+    op.drop_index('ix_genres_name_trgm', table_name='genres')
+
+    for table, (owner, owner_table) in ASSOCIATIONS.items():
+        op.drop_index(f'ix_{table}_genre_id', table_name=table)
+        op.drop_constraint(f'{table}_genre_id_fkey', table, type_='foreignkey')
+        op.drop_constraint(f'{table}_{owner}_fkey', table, type_='foreignkey')
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.add_column(table, sa.Column('genre', sa.String(length=50), nullable=True))
+        op.execute(
+            f"UPDATE {table} t SET genre = g.name FROM genres g WHERE g.id = t.genre_id"
+        )
+        op.alter_column(table, 'genre', nullable=False)
+        op.drop_column(table, 'genre_id')
+        # SERIAL backfills existing rows while adding the column.
+        op.execute(f'ALTER TABLE {table} ADD COLUMN id SERIAL NOT NULL')
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+        # venue_genres cascaded before this revision, artist_genres did not.
+        op.create_foreign_key(
+            f'{table}_{owner}_fkey', table, owner_table, [owner], ['id'],
+            ondelete='CASCADE' if table == 'venue_genres' else None,
+        )
+        op.create_index(f'ix_{table}_{owner}', table, [owner])
+        op.create_index(
+            f'ix_{table}_genre_trgm', table, [sa.text('genre gin_trgm_ops')],
+            postgresql_using='gin',
+        )
+
+    op.drop_table('genres')
@@ -0,0 +1,190 @@
+import datetime
+
+from replicas import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+
+class Genre(db.Model):
+    __tablename__ = "genres"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+
+class Venue_Genre(db.Model):
+    __tablename__ = "venue_genres"
+    # The primary key's leading column serves lookups by venue.
+    venue_id = db.Column(
+        db.Integer,
+        db.ForeignKey("venues.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    genre_id = db.Column(
+        db.Integer, db.ForeignKey("genres.id"), primary_key=True, index=True
+    )
+    owner = db.Column(db.String(50), default='Umar Abdullahi')
+
+
+class Venue(db.Model):
+    __tablename__ = "venues"
+    __table_args__ = (
+        db.Index("ix_venues_city_state", "city", "state"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=True)
+    owner = db.Column(db.String(50), default='Umar Abdullahi')
+    genres = db.relationship(
+        "Genre", secondary="venue_genres", order_by="Genre.name", viewonly=True,
+    )
+    seeking_talent = db.Column(db.Boolean, nullable=True, default=False)
+    seeking_description = db.Column(db.String(120), nullable=True)
+    image_link = db.Column(
+        db.String(500),
+        nullable=True,
+        default="https://images.unsplash.com/photo-1600585154084-4e5fe7c39198?ixlib=rb-1.2.1&ixid=MnwxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8&auto=format&fit=crop&w=870&q=80",
+    )
+    facebook_link = db.Column(db.String(120), nullable=True, default="")
+    website = db.Column(db.String(120), nullable=True)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.now,
+        onupdate=datetime.datetime.now,
+        server_default=db.func.now(),
+        index=True,
+    )
+
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+
+class Show(db.Model):
+    __tablename__ = "shows"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "artist_id",
+            "venue_id",
+            "start_time",
+            name="uq_shows_artist_id_venue_id_start_time",
+        ),
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        "artists.id"), nullable=False)
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), nullable=False
+    )
+    owner = db.Column(db.String(50), default='Umar Abdullahi')
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.now,
+        onupdate=datetime.datetime.now,
+        server_default=db.func.now(),
+        index=True,
+    )
+
+
+class Artist_Genre(db.Model):
+    __tablename__ = "artist_genres"
+    artist_id = db.Column(
+        db.Integer,
+        db.ForeignKey("artists.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    genre_id = db.Column(
+        db.Integer, db.ForeignKey("genres.id"), primary_key=True, index=True
+    )
+    owner = db.Column(db.String(50), default='Umar Abdullahi')
+
+
+class Artist(db.Model):
+    __tablename__ = "artists"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    genres = db.relationship(
+        "Genre", secondary="artist_genres", order_by="Genre.name", viewonly=True,
+    )
+    owner = db.Column(db.String(50), default='Umar Abdullahi')
+    image_link = db.Column(
+        db.String(500),
+        nullable=True,
+        default="https://assets.about.me/background/users/u/m/a/umarabdullahi_1634476090_225.jpg",
+    )
+    facebook_link = db.Column(db.String(120), nullable=True)
+    venues = db.relationship(
+        "Venue",
+        secondary="shows",
+        viewonly=True,
+        backref=db.backref("artists", lazy=True, viewonly=True),
+    )
+    seeking_venue = db.Column(db.Boolean, nullable=True, default=False)
+    seeking_description = db.Column(db.String(30), nullable=True, default="")
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.datetime.now,
+        onupdate=datetime.datetime.now,
+        server_default=db.func.now(),
+        index=True,
+    )
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+
+#----------------------------------------------------------------------------#
+# Summaries.
+#----------------------------------------------------------------------------#
+#
+# One narrow row per venue or artist with the aggregates the list and
+# search pages show, rebuilt by summaries.refresh() whenever its owner,
+# genres or shows change. Counts split upcoming/past at the time of the
+# refresh and stay correct until next_show_at passes.
+
+
+class Venue_Summary(db.Model):
+    __tablename__ = "venue_summaries"
+    __table_args__ = (
+        db.Index("ix_venue_summaries_city_state_id", "city", "state", "id"),
+    )
+    id = db.Column(
+        db.Integer, db.ForeignKey("venues.id", ondelete="CASCADE"), primary_key=True
+    )
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.String, nullable=False, default="")
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    num_past_shows = db.Column(db.Integer, nullable=False, default=0)
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+
+class Artist_Summary(db.Model):
+    __tablename__ = "artist_summaries"
+    id = db.Column(
+        db.Integer, db.ForeignKey("artists.id", ondelete="CASCADE"), primary_key=True
+    )
+    name = db.Column(db.String(120), nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.String, nullable=False, default="")
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    num_past_shows = db.Column(db.Integer, nullable=False, default=0)
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,552 @@
+"""Query helpers shared by the views and the search engine."""
+import base64
+import collections
+import datetime
+
+from flask import current_app
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.orm import joinedload
+
+import summaries
+from genres import association
+from models import db, Genre, Venue, Show, Artist, Venue_Summary, Artist_Summary
+
+_ENTITIES = {
+    Venue: "venues",
+    Venue_Summary: "venues",
+    Artist: "artists",
+    Artist_Summary: "artists",
+}
+
+
+def catalog_filters(model, genre=None, state=None):
+    """Criteria keeping the venues or artists with ``genre`` and in ``state``.
+
+    ``model`` is Venue, Artist or one of their summaries. The genre name
+    is resolved to its id once, so the filter is an integer lookup in the
+    association table.
+    """
+    criteria = []
+    if genre is not None:
+        table, owner = association(_ENTITIES[model])
+        genre_id = select(Genre.id).where(Genre.name == genre).scalar_subquery()
+        criteria.append(model.id.in_(select(owner).where(table.c.genre_id == genre_id)))
+    if state is not None:
+        criteria.append(model.state == state)
+    return criteria
+
+
+def listing_facets(rows, genre=None, state=None):
+    """Genre and state facets of summary rows, under the active filters.
+
+    Returns ``{"genre": [(name, count)], "state": [(state, count)]}``,
+    largest counts first. Each facet counts the rows matching every
+    filter but its own: the states of the rows with ``genre``, the genres
+    of the rows in ``state``, so that each pill counts what its link
+    lists. ``rows`` carry their state and genres; unfiltered, they are
+    the listing rows themselves, otherwise those of facet_query().
+    """
+    counts = {"genre": collections.Counter(), "state": collections.Counter()}
+    for row in rows:
+        genres = row.genres.split(summaries.GENRE_SEPARATOR) if row.genres else []
+        if genre is None or genre in genres:
+            counts["state"][row.state] += 1
+        if state is None or row.state == state:
+            counts["genre"].update(genres)
+    return {
+        facet: sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        for facet, values in counts.items()
+    }
+
+
+def facet_query(model, genre=None, state=None):
+    """``(state, genres)`` of the rows listing_facets() counts when filtered.
+
+    With both filters set those are the rows matching either one; with a
+    single filter, every row, since the other facet ignores it.
+    """
+    summary = summaries.summary_model(_ENTITIES[model])
+    query = db.session.query(summary.state, summary.genres)
+    if genre is not None and state is not None:
+        query = query.filter(
+            or_(*catalog_filters(summary, genre=genre), *catalog_filters(summary, state=state))
+        )
+    return query
+
+
+def browse_facets(model, rows, genre=None, state=None):
+    """listing_facets() of a listing: from its ``rows`` when unfiltered."""
+    if genre is not None or state is not None:
+        rows = facet_query(model, genre, state).all()
+    return listing_facets(rows, genre, state)
+
+
+def venue_listing_query(genre=None, state=None):
+    """Every venue with its upcoming show count, grouped by city and state.
+
+    Rows are ``(id, name, city, state, genres, num_upcoming_shows,
+    next_show_at, refreshed_at)`` ordered so that each city/state area is
+    contiguous, optionally narrowed to one genre and/or state. They are
+    read from venue_summaries; see venue_listing().
+    """
+    return (
+        db.session.query(
+            Venue_Summary.id,
+            Venue_Summary.name,
+            Venue_Summary.city,
+            Venue_Summary.state,
+            Venue_Summary.genres,
+            Venue_Summary.num_upcoming_shows,
+            Venue_Summary.next_show_at,
+            Venue_Summary.refreshed_at,
+        )
+        .filter(*catalog_filters(Venue_Summary, genre, state))
+        .order_by(Venue_Summary.city, Venue_Summary.state, Venue_Summary.id)
+    )
+
+
+def catalog_page_query(model, after=None):
+    """Compact listing of venues or artists for cursor pagination.
+
+    Rows are ``(id, name, city, state, genres, num_upcoming_shows)``
+    ordered by id, starting after id ``after``, read from the summaries
+    of ``model`` (Venue or Artist); ``genres`` is one joined string.
+    """
+    summary = summaries.summary_model(_ENTITIES[model])
+    query = db.session.query(
+        summary.id,
+        summary.name,
+        summary.city,
+        summary.state,
+        summary.genres,
+        summary.num_upcoming_shows,
+    ).order_by(summary.id)
+    if after is not None:
+        query = query.filter(summary.id > after)
+    return query
+
+
+def venue_shows_query(venue_id):
+    """A venue's shows joined to their artists, oldest first.
+
+    Rows are ``(start_time, artist_id, artist_name, artist_image_link,
+    artist_updated_at)``.
+    """
+    return (
+        db.session.query(
+            Show.start_time, Artist.id, Artist.name, Artist.image_link,
+            Artist.updated_at,
+        )
+        .join(Artist, Artist.id == Show.artist_id)
+        .filter(Show.venue_id == venue_id)
+        .order_by(Show.start_time)
+    )
+
+
+def artist_shows_query(artist_id):
+    """An artist's shows joined to their venues, oldest first.
+
+    Rows are ``(start_time, venue_id, venue_name, venue_image_link,
+    venue_updated_at)``.
+    """
+    return (
+        db.session.query(
+            Show.start_time, Venue.id, Venue.name, Venue.image_link,
+            Venue.updated_at,
+        )
+        .join(Venue, Venue.id == Show.venue_id)
+        .filter(Show.artist_id == artist_id)
+        .order_by(Show.start_time)
+    )
+
+
+SHOW_FILTERS = ("all", "upcoming", "past")
+
+
+def encode_show_cursor(start_time, artist_id, venue_id):
+    """Encode the keyset of the last show on a page as an opaque token."""
+    raw = f"{start_time.isoformat()}|{artist_id}|{venue_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_show_cursor(cursor):
+    """Inverse of encode_show_cursor(); raises ValueError on bad input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_time, artist_id, venue_id = raw.split("|")
+        return (
+            datetime.datetime.fromisoformat(start_time),
+            int(artist_id),
+            int(venue_id),
+        )
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"invalid cursor {cursor!r}") from error
+
+
+def shows_query(when="all", after=None):
+    """Show/Artist/Venue join behind the /shows listing, in keyset order.
+
+    Only the rendered columns are selected, plus the artist's and venue's
+    updated_at, which version the rendered show tiles. Upcoming and all shows run
+    oldest first, past shows most recent first; ``after`` is a cursor from
+    encode_show_cursor() and resumes strictly after that keyset.
+    """
+    keyset = tuple_(Show.start_time, Show.artist_id, Show.venue_id)
+
+    query = (
+        db.session.query(
+            Show.start_time,
+            Show.artist_id,
+            Show.venue_id,
+            Artist.name,
+            Artist.image_link,
+            Venue.name,
+            Artist.updated_at,
+            Venue.updated_at,
+        )
+        .join(Artist, Artist.id == Show.artist_id)
+        .join(Venue, Venue.id == Show.venue_id)
+    )
+
+    now = datetime.datetime.now()
+    if when == "upcoming":
+        query = query.filter(Show.start_time >= now)
+    elif when == "past":
+        query = query.filter(Show.start_time < now)
+
+    descending = when == "past"
+    if after is not None:
+        position = tuple_(*decode_show_cursor(after))
+        query = query.filter(keyset < position if descending else keyset > position)
+
+    if descending:
+        return query.order_by(
+            Show.start_time.desc(), Show.artist_id.desc(), Show.venue_id.desc()
+        )
+    return query.order_by(Show.start_time, Show.artist_id, Show.venue_id)
+
+
+def shows_page(when="all", after=None, per_page=None):
+    """Return one page of shows_query() as ``(rows, next_cursor)``.
+
+    ``per_page`` defaults to SHOWS_PER_PAGE and is kept between 1 and
+    SHOWS_MAX_PER_PAGE; ``next_cursor`` is None on the last page.
+    """
+    per_page = max(1, min(
+        per_page or current_app.config["SHOWS_PER_PAGE"],
+        current_app.config["SHOWS_MAX_PER_PAGE"],
+    ))
+
+    rows = shows_query(when, after).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_show_cursor(*rows[-1][:3])
+
+    return rows, next_cursor
+
+
+def split_shows(shows, now=None):
+    """Partition show dicts into ``(past_shows, upcoming_shows, next_show_time)``.
+
+    Callers only need to fetch their shows once. ``next_show_time`` is
+    the earliest upcoming start, i.e. the moment the split changes, or
+    None when nothing is upcoming.
+    """
+    now = now or datetime.datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    next_show_time = None
+    for show in shows:
+        if show["start_time"] < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+            if next_show_time is None or show["start_time"] < next_show_time:
+                next_show_time = show["start_time"]
+    return past_shows, upcoming_shows, next_show_time
+
+
+def venue_listing(genre=None, state=None, now=None):
+    """The rows of venue_listing_query(), none of them stale.
+
+    The rows carry their next_show_at, so they answer the probe of
+    summaries.refresh_stale() themselves: only when one has passed is it
+    rebuilt, committed and the listing read again.
+    """
+    now = now or datetime.datetime.now()
+    rows = venue_listing_query(genre, state).all()
+    stale = [
+        row.id for row in rows if row.next_show_at is not None and row.next_show_at <= now
+    ]
+    if stale:
+        summaries.refresh("venues", stale, now)
+        db.session.commit()
+        rows = venue_listing_query(genre, state).all()
+    return rows
+
+
+def venue_areas(rows):
+    """Group venue_listing() rows into ``{"city", "state", "venues"}`` areas.
+
+    Each venue carries ``next_show_time``, its earliest upcoming show, and
+    ``version``, which changes whenever its summary row is rebuilt.
+    """
+    data = []
+    areas = {}
+    for (id, name, city, state, _, num_upcoming_shows,
+         next_show_time, refreshed_at) in rows:
+        location_data = areas.get((city, state))
+        if location_data is None:
+            location_data = {"city": city, "state": state, "venues": []}
+            areas[(city, state)] = location_data
+            data.append(location_data)
+
+        location_data["venues"].append({
+            "id": id,
+            "name": name,
+            "num_upcoming_shows": num_upcoming_shows,
+            "next_show_time": next_show_time,
+            "version": refreshed_at,
+        })
+
+    return data
+
+
+def venue_detail(venue_id):
+    """Template data for a venue's page, or None if it does not exist.
+
+    The venue and its genres come from one joined lookup, and all of its
+    shows from one query joined to their artists.
+    """
+    venue = Venue.query.options(joinedload(Venue.genres)).get(venue_id)
+    if venue is None:
+        return None
+
+    genres = [genre.name for genre in venue.genres]
+
+    shows = venue_shows_query(venue_id).all()
+    past_shows, upcoming_shows, next_show_time = split_shows(
+        {
+            "artist_id": artist_id,
+            "artist_name": artist_name,
+            "artist_image_link": artist_image_link,
+            "start_time": start_time,
+            "version": artist_updated_at,
+        }
+        for (start_time, artist_id, artist_name, artist_image_link,
+             artist_updated_at) in shows
+    )
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+        "next_show_time": next_show_time,
+    }
+
+
+def artist_listing_query(genre=None, state=None):
+    """``(id, name, state, genres, refreshed_at)`` of every artist, for /artists."""
+    return (
+        db.session.query(
+            Artist_Summary.id,
+            Artist_Summary.name,
+            Artist_Summary.state,
+            Artist_Summary.genres,
+            Artist_Summary.refreshed_at,
+        )
+        .filter(*catalog_filters(Artist_Summary, genre, state))
+        .order_by(Artist_Summary.id)
+    )
+
+
+def artist_detail(artist_id):
+    """Template data for an artist's page, or None if it does not exist."""
+    artist = Artist.query.options(joinedload(Artist.genres)).get(artist_id)
+    if artist is None:
+        return None
+
+    genres = [genre.name for genre in artist.genres]
+
+    shows = artist_shows_query(artist_id).all()
+    past_shows, upcoming_shows, next_show_time = split_shows(
+        {
+            "venue_id": venue_id,
+            "venue_name": venue_name,
+            "venue_image_link": venue_image_link,
+            "start_time": start_time,
+            "version": venue_updated_at,
+        }
+        for (start_time, venue_id, venue_name, venue_image_link,
+             venue_updated_at) in shows
+    )
+
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "seeking_venue": False,
+        "facebook_link": artist.facebook_link,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+        "next_show_time": next_show_time,
+    }
+
+
+def next_area_show_time(areas):
+    """The earliest upcoming show across venue_areas(), or None."""
+    return min(
+        (
+            venue["next_show_time"]
+            for area in areas
+            for venue in area["venues"]
+            if venue["next_show_time"] is not None
+        ),
+        default=None,
+    )
+
+
+def venue_browse(genre=None, state=None):
+    """Template data for /venues: areas, facets and ``next_show_time``."""
+    rows = venue_listing(genre, state)
+    areas = venue_areas(rows)
+    return {
+        "areas": areas,
+        "facets": browse_facets(Venue, rows, genre, state),
+        "next_show_time": next_area_show_time(areas),
+    }
+
+
+def artist_browse(genre=None, state=None):
+    """Template data for /artists: the artists and their facets."""
+    rows = artist_listing_query(genre, state).all()
+    return {
+        "artists": [
+            {"id": row.id, "name": row.name, "version": row.refreshed_at} for row in rows
+        ],
+        "facets": browse_facets(Artist, rows, genre, state),
+    }
+
+#----------------------------------------------------------------------------#
+# Page versions.
+#----------------------------------------------------------------------------#
+#
+# Each read page gets a version token that changes whenever its content
+# could: the latest updated_at of every table it renders (a create or an
+# edit), row counts where rows can be deleted, and the next show start
+# the page depends on (a show moving from upcoming to past). All parts
+# are index lookups, fetched together in one statement.
+
+
+def _page_version(updated, others=()):
+    """Run ``updated`` (max updated_at) and ``others`` as one SELECT.
+
+    Returns ``(token, last_modified)``.
+    """
+    row = db.session.query(
+        *(query.scalar_subquery() for query in (*updated, *others))
+    ).one()
+    stamps = [stamp for stamp in row[:len(updated)] if stamp is not None]
+    return tuple(row), max(stamps, default=None)
+
+
+def _next_show(*criteria, now=None):
+    now = now or datetime.datetime.now()
+    return db.session.query(func.min(Show.start_time)).filter(
+        Show.start_time > now, *criteria
+    )
+
+
+def venues_version(now=None):
+    """Version of /venues: venues, their upcoming show counts."""
+    return _page_version(
+        [
+            db.session.query(func.max(Venue.updated_at)),
+            db.session.query(func.max(Show.updated_at)),
+        ],
+        [db.session.query(func.count(Venue.id)), _next_show(now=now)],
+    )
+
+
+def artists_version():
+    """Version of /artists, which lists artist names only."""
+    return _page_version(
+        [db.session.query(func.max(Artist.updated_at))],
+        [db.session.query(func.count(Artist.id))],
+    )
+
+
+def shows_version(now=None):
+    """Version of every /shows page.
+
+    Shows are only removed along with their venue or artist, so the
+    venue and artist counts stand in for a count of shows.
+    """
+    return _page_version(
+        [
+            db.session.query(func.max(Show.updated_at)),
+            db.session.query(func.max(Venue.updated_at)),
+            db.session.query(func.max(Artist.updated_at)),
+        ],
+        [
+            db.session.query(func.count(Venue.id)),
+            db.session.query(func.count(Artist.id)),
+            _next_show(now=now),
+        ],
+    )
+
+
+def venue_version(venue_id, now=None):
+    """Version of a venue's page, or None if the venue does not exist."""
+    token, last_modified = _page_version(
+        [
+            db.session.query(Venue.updated_at).filter(Venue.id == venue_id),
+            db.session.query(func.max(Show.updated_at)).filter(Show.venue_id == venue_id),
+            db.session.query(func.max(Artist.updated_at))
+            .join(Show, Show.artist_id == Artist.id)
+            .filter(Show.venue_id == venue_id),
+        ],
+        [
+            db.session.query(func.count(Show.id)).filter(Show.venue_id == venue_id),
+            _next_show(Show.venue_id == venue_id, now=now),
+        ],
+    )
+    return None if token[0] is None else (token, last_modified)
+
+
+def artist_version(artist_id, now=None):
+    """Version of an artist's page, or None if the artist does not exist."""
+    token, last_modified = _page_version(
+        [
+            db.session.query(Artist.updated_at).filter(Artist.id == artist_id),
+            db.session.query(func.max(Show.updated_at)).filter(Show.artist_id == artist_id),
+            db.session.query(func.max(Venue.updated_at))
+            .join(Show, Show.venue_id == Venue.id)
+            .filter(Show.artist_id == artist_id),
+        ],
+        [
+            db.session.query(func.count(Show.id)).filter(Show.artist_id == artist_id),
+            _next_show(Show.artist_id == artist_id, now=now),
+        ],
+    )
+    return None if token[0] is None else (token, last_modified)
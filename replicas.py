@@ -0,0 +1,113 @@
+"""Read-replica routing.
+
+With SQLALCHEMY_REPLICA_URIS set (DATABASE_REPLICA_URLS in the
+environment, comma separated), reads of GET and HEAD requests, and of
+POST views marked read_only() such as the search forms, go to a replica
+picked round-robin per request. Everything else stays on the primary:
+
+* other POST requests, and GET views marked writes() such as the delete
+  links, whose lookups must not read a lagging replica;
+* writes: flushes and INSERT/UPDATE/DELETE statements (e.g. the summary
+  refreshes some reads trigger), after which the rest of the request
+  reads from the primary too, so it sees its own writes;
+* textual SQL, which may write;
+* CLI commands and migrations, which run outside a request;
+* clients that wrote within the last REPLICA_MAX_LAG_SECONDS, so the
+  page a create_* or edit_* handler redirects to shows the change even
+  if the replica has not replayed it yet. The deadline is kept in the
+  signed session cookie, so API clients need to keep cookies to get it.
+
+Replicas are ordinary Flask-SQLAlchemy binds (``replica_0``,
+``replica_1``...) without tables, so create_all() and the migrations
+never touch them. Entries the read cache fills from a replica can lag
+the primary by the replication delay until they are next invalidated.
+"""
+import itertools
+import time
+
+from flask import current_app, request, session as client_session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Session cookie key holding the time until which a client reads from
+# the primary.
+_PRIMARY_UNTIL = "_primary_until"
+
+
+def read_only(view):
+    """Mark ``view`` as only reading, whatever its HTTP method."""
+    view.read_only = True
+    return view
+
+
+def writes(view):
+    """Mark ``view`` as writing, whatever its HTTP method."""
+    view.read_only = False
+    return view
+
+
+def _reads_only():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "read_only", request.method in SAFE_METHODS)
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads to a replica once use_replica() was called."""
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        self._db = db
+        self._replica = None
+
+    def use_replica(self):
+        """Route this session's reads to the next replica, if any."""
+        replicas = self.app.extensions["replicas"]
+        if replicas is not None:
+            self._replica = self._db.get_engine(self.app, bind=next(replicas))
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._replica is not None:
+            if not self._flushing and not isinstance(clause, (UpdateBase, TextClause)):
+                return self._replica
+            # Stay on the primary for the rest of the session.
+            self._replica = None
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension whose sessions can read from replicas."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app):
+        replicas = {
+            f"replica_{number}": uri
+            for number, uri in enumerate(app.config.get("SQLALCHEMY_REPLICA_URIS") or ())
+        }
+        if replicas:
+            app.config["SQLALCHEMY_BINDS"] = {
+                **(app.config.get("SQLALCHEMY_BINDS") or {}),
+                **replicas,
+            }
+        super().init_app(app)
+        app.extensions["replicas"] = itertools.cycle(replicas) if replicas else None
+
+        if replicas:
+            app.before_request(self._route_reads)
+            app.after_request(self._pin_writer)
+
+    def _route_reads(self):
+        if _reads_only() and client_session.get(_PRIMARY_UNTIL, 0) <= time.time():
+            self.session().use_replica()
+
+    def _pin_writer(self, response):
+        if not _reads_only():
+            client_session[_PRIMARY_UNTIL] = (
+                time.time() + current_app.config["REPLICA_MAX_LAG_SECONDS"]
+            )
+        return response
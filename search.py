@@ -0,0 +1,309 @@
+"""Venue and artist search.
+
+Search matches the term, case-insensitively and anywhere in the string,
+against an entity's name, its "city state" location and its genres, and
+returns ranked results together with the total number of matches.
+Shows are searched through their artist and their venue: a show matches
+when either does.
+
+Two backends share that contract:
+
+* PostgreSQL uses the pg_trgm GIN indexes and the ``simple`` tsvector
+  expression indexes created by migration b7d1f0c2a9e4. ILIKE filters are
+  served by the trigram indexes and hits are ranked by trigram similarity
+  plus ``ts_rank``. Genre terms are matched against the small ``genres``
+  lookup table first, then followed to their owners by genre id.
+* SQLite (local development) keeps one FTS5 table per entity using the
+  ``trigram`` tokenizer, maintained by triggers created alongside the
+  tables, and ranks MATCH hits with bm25.
+
+Either way a single statement returns a bounded page of hits, with the
+total count carried on each row by ``count(*) OVER ()``. A page past the
+last hit has no row to carry it, and takes a second statement counting
+the hits.
+"""
+from flask import current_app
+from sqlalchemy import DDL, event, func, literal_column, or_, select, table, column
+
+import queries
+import summaries
+from models import db, Genre, Venue_Genre, Venue, Artist_Genre, Artist, Show
+
+# FTS5 trigram MATCH needs at least three characters; shorter terms fall
+# back to LIKE over the same virtual table.
+MIN_MATCH_LENGTH = 3
+
+_ENTITIES = {
+    "venues": (Venue, Venue_Genre, Venue_Genre.venue_id),
+    "artists": (Artist, Artist_Genre, Artist_Genre.artist_id),
+}
+
+
+def search_venues(term, limit=None, offset=0):
+    """Search venues.
+
+    Returns ``(count, [{"id", "name", "num_upcoming_shows"}, ...])``.
+    """
+    return _search("venues", term, limit, offset)
+
+
+def search_artists(term, limit=None, offset=0):
+    """Search artists.
+
+    Returns ``(count, [{"id", "name", "num_upcoming_shows"}, ...])``.
+    """
+    return _search("artists", term, limit, offset)
+
+
+def search_shows(term, when="all", limit=None, offset=0):
+    """Search shows by their artist and venue.
+
+    Returns ``(count, rows)``, the rows of queries.shows_query(``when``)
+    whose artist or venue matches ``term``, in the same order.
+    """
+    limit = limit or current_app.config["SEARCH_RESULTS_LIMIT"]
+    query = queries.shows_query(when).filter(
+        or_(
+            Show.artist_id.in_(_hit_ids("artists", term)),
+            Show.venue_id.in_(_hit_ids("venues", term)),
+        )
+    )
+    rows = (
+        query.add_columns(func.count().over().label("total"))
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return _count(rows, offset, query), rows
+
+
+def _matches(entity, term):
+    term = (term or "").strip()
+    if db.engine.dialect.name == "postgresql":
+        return _postgresql_query(entity, term)
+    return _sqlite_query(entity, term)
+
+
+def _hit_ids(entity, term):
+    """The ids of the ``entity`` search hits, unranked, as a subquery."""
+    model = _ENTITIES[entity][0]
+    return _matches(entity, term).with_only_columns(model.id).order_by(None)
+
+
+def search_query(entity, term):
+    """The ranked search statement for ``entity`` ("venues" or "artists").
+
+    Selects ``id``, ``name``, ``total`` and ``num_upcoming_shows``; callers
+    apply their own limit and offset.
+    """
+    query = _matches(entity, term)
+
+    # Upcoming show counts come from the hits' summary rows, joined by
+    # primary key, rather than from aggregating their shows.
+    model = _ENTITIES[entity][0]
+    summary = summaries.summary_model(entity)
+    return (
+        query.outerjoin(summary, summary.id == model.id)
+        .add_columns(
+            func.coalesce(summary.num_upcoming_shows, 0)
+            .label("num_upcoming_shows")
+        )
+    )
+
+
+def _search(entity, term, limit, offset):
+    limit = limit or current_app.config["SEARCH_RESULTS_LIMIT"]
+    summaries.refresh_stale(entity)
+    query = search_query(entity, term)
+
+    rows = db.session.execute(query.limit(limit).offset(offset)).all()
+
+    return _count(rows, offset, query), [
+        {
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.num_upcoming_shows,
+        }
+        for row in rows
+    ]
+
+
+def _count(rows, offset, query):
+    """The total carried by ``rows``, a page of ``query``, or counted anew."""
+    if rows:
+        return rows[0].total
+    if offset:
+        return db.session.scalar(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+    return 0
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+#----------------------------------------------------------------------------#
+# PostgreSQL.
+#----------------------------------------------------------------------------#
+
+
+def _document(model):
+    """The tsvector expression indexed by ix_<table>_search_document."""
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        model.name + literal_column("' '") + model.city
+        + literal_column("' '") + model.state,
+    )
+
+
+def _postgresql_query(entity, term):
+    model, genre_model, genre_owner = _ENTITIES[entity]
+    query = select(
+        model.id, model.name, func.count().over().label("total")
+    )
+
+    if not term:
+        return query.order_by(model.name, model.id)
+
+    pattern = _like_pattern(term)
+    location = model.city + literal_column("' '") + model.state
+    tsquery = func.plainto_tsquery(literal_column("'simple'"), term)
+    genre_match = select(genre_owner).where(
+        genre_model.genre_id.in_(select(Genre.id).where(Genre.name.ilike(pattern)))
+    )
+
+    rank = (
+        func.greatest(
+            func.similarity(model.name, term),
+            func.similarity(location, term),
+        )
+        + func.ts_rank(_document(model), tsquery)
+    )
+
+    return (
+        query.where(
+            or_(
+                model.name.ilike(pattern),
+                model.city.ilike(pattern),
+                _document(model).op("@@")(tsquery),
+                model.id.in_(genre_match),
+            )
+        )
+        .order_by(rank.desc(), model.name, model.id)
+    )
+
+
+#----------------------------------------------------------------------------#
+# SQLite FTS5 fallback.
+#----------------------------------------------------------------------------#
+
+
+def _fts_table(entity):
+    return table(
+        f"{entity}_search",
+        column("rowid"),
+        column("name"),
+        column("location"),
+        column("genres"),
+        column("rank"),
+    )
+
+
+def _sqlite_query(entity, term):
+    model = _ENTITIES[entity][0]
+    fts = _fts_table(entity)
+    query = (
+        select(model.id, model.name, func.count().over().label("total"))
+        .join(fts, fts.c.rowid == model.id)
+    )
+
+    if not term:
+        return query.order_by(model.name, model.id)
+
+    if len(term) >= MIN_MATCH_LENGTH:
+        phrase = '"' + term.replace('"', '""') + '"'
+        return (
+            query.where(literal_column(fts.name).match(phrase))
+            .order_by(fts.c.rank, model.name, model.id)
+        )
+
+    pattern = _like_pattern(term)
+    return (
+        query.where(
+            or_(
+                fts.c.name.like(pattern, escape="\\"),
+                fts.c.location.like(pattern, escape="\\"),
+                fts.c.genres.like(pattern, escape="\\"),
+            )
+        )
+        .order_by(model.name, model.id)
+    )
+
+
+def _sqlite_ddl(entity, owner, genre_table):
+    """FTS5 table plus the triggers keeping it in step with ``entity``."""
+    refresh = f"""
+        INSERT OR REPLACE INTO {entity}_search (rowid, name, location, genres)
+        SELECT e.id, e.name, e.city || ' ' || e.state,
+               coalesce((SELECT group_concat(n.name, ' ')
+                         FROM {genre_table} g JOIN genres n ON n.id = g.genre_id
+                         WHERE g.{owner} = e.id), '')
+        FROM {entity} e WHERE e.id = {{ref}};
+    """
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {entity}_search
+            USING fts5(name, location, genres, tokenize='trigram')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {entity}_search_insert
+            AFTER INSERT ON {entity} BEGIN
+            {refresh.format(ref="NEW.id")} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {entity}_search_update
+            AFTER UPDATE ON {entity} BEGIN
+            {refresh.format(ref="NEW.id")} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {entity}_search_delete
+            AFTER DELETE ON {entity} BEGIN
+            DELETE FROM {entity}_search WHERE rowid = OLD.id; END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {genre_table}_search_insert
+            AFTER INSERT ON {genre_table} BEGIN
+            {refresh.format(ref="NEW." + owner)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {genre_table}_search_delete
+            AFTER DELETE ON {genre_table} BEGIN
+            {refresh.format(ref="OLD." + owner)} END""",
+    ]
+
+
+def rebuild_sqlite_index():
+    """Repopulate the FTS5 tables from scratch, e.g. for a pre-existing db."""
+    for entity, (model, genre_model, genre_owner) in _ENTITIES.items():
+        db.session.execute(f"DELETE FROM {entity}_search")
+        db.session.execute(
+            f"""INSERT INTO {entity}_search (rowid, name, location, genres)
+                SELECT e.id, e.name, e.city || ' ' || e.state,
+                       coalesce((SELECT group_concat(n.name, ' ')
+                                 FROM {genre_model.__tablename__} g
+                                 JOIN genres n ON n.id = g.genre_id
+                                 WHERE g.{genre_owner.key} = e.id), '')
+                FROM {entity} e"""
+        )
+    db.session.commit()
+
+
+for _entity, (_model, _genre_model, _genre_owner) in _ENTITIES.items():
+    # Genre tables are created after their owners, so hang everything off
+    # them; dropping the owner drops its triggers but not the FTS table.
+    for _statement in _sqlite_ddl(
+        _entity, _genre_owner.key, _genre_model.__tablename__
+    ):
+        event.listen(
+            _genre_model.__table__,
+            "after_create",
+            DDL(_statement).execute_if(dialect="sqlite"),
+        )
+    event.listen(
+        _model.__table__,
+        "after_drop",
+        DDL(f"DROP TABLE IF EXISTS {_entity}_search").execute_if(
+            dialect="sqlite"
+        ),
+    )
@@ -0,0 +1,265 @@
+"""Queued show bookings.
+
+With SHOW_WRITES = "queued", create_show_submission and POST
+/api/v1/shows only validate a booking and append it to a work table in
+a local SQLite file (SHOW_QUEUE_PATH), then answer at once with its id;
+GET /api/v1/bookings/<id> reports whether it was booked. Appends are
+durable (WAL, synchronous=FULL) before the request returns.
+
+``flask show-worker`` drains the table. It claims up to
+SHOW_QUEUE_BATCH_SIZE bookings at a time and writes them to the main
+database in one transaction: one lookup each for the artists, venues and
+existing shows of the whole batch, one multi-row insert and one summary
+refresh (see bulk.write_shows()). Bookings whose artist or venue does not
+exist, that are already booked or that the database refuses, end up
+rejected with the reason, so no booking holds up the rest of its batch.
+
+A worker that dies mid-batch leaves bookings "processing"; the next one
+to start marks them booked if their show exists and queues them again
+otherwise. Worker writes only reach the web processes' read cache when
+it is shared (CACHE_BACKEND = "redis"); with the in-process cache, pages
+may miss new shows for up to CACHE_DEFAULT_TTL.
+"""
+import datetime
+import json
+import sqlite3
+import time
+
+from flask import current_app, g
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+import bulk
+from cache import cache_key
+from models import db, Show
+
+QUEUED = "queued"
+PROCESSING = "processing"
+BOOKED = "booked"
+REJECTED = "rejected"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS show_bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    artist_id INTEGER NOT NULL,
+    venue_id INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    status TEXT NOT NULL,
+    show_id INTEGER,
+    errors TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_show_bookings_status_id ON show_bookings (status, id);
+"""
+
+
+def init_app(app):
+    app.config.setdefault("SHOW_WRITES", "sync")
+    app.config.setdefault("SHOW_QUEUE_PATH", "show_queue.db")
+    app.config.setdefault("SHOW_QUEUE_BATCH_SIZE", 500)
+    app.config.setdefault("SHOW_QUEUE_POLL_SECONDS", 1.0)
+    app.teardown_appcontext(close_connection)
+
+
+def enabled():
+    return current_app.config["SHOW_WRITES"] == "queued"
+
+
+def connect(path=None):
+    """Open the queue database, creating its table on first use."""
+    connection = sqlite3.connect(
+        path or current_app.config["SHOW_QUEUE_PATH"],
+        timeout=30,
+        isolation_level=None,  # autocommit; batches BEGIN explicitly
+    )
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=FULL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _connection():
+    """The request's queue connection, closed by close_connection()."""
+    if "show_queue" not in g:
+        g.show_queue = connect()
+    return g.show_queue
+
+
+def close_connection(error=None):
+    connection = g.pop("show_queue", None)
+    if connection is not None:
+        connection.close()
+
+
+def _now():
+    return datetime.datetime.now().isoformat(sep=" ")
+
+
+def enqueue(data):
+    """Queue validated show ``data``; returns the booking id."""
+    now = _now()
+    cursor = _connection().execute(
+        "INSERT INTO show_bookings "
+        "(artist_id, venue_id, start_time, status, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            data["artist_id"],
+            data["venue_id"],
+            data["start_time"].isoformat(sep=" "),
+            QUEUED,
+            now,
+            now,
+        ),
+    )
+    return cursor.lastrowid
+
+
+def booking(booking_id):
+    """The booking as a dict, or None if there is no such booking."""
+    row = _connection().execute(
+        "SELECT * FROM show_bookings WHERE id = ?", (booking_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row["id"],
+        "status": row["status"],
+        "artist_id": row["artist_id"],
+        "venue_id": row["venue_id"],
+        "start_time": datetime.datetime.fromisoformat(row["start_time"]),
+        "show_id": row["show_id"],
+        "errors": json.loads(row["errors"]) if row["errors"] else None,
+        "created_at": datetime.datetime.fromisoformat(row["created_at"]),
+    }
+
+
+#  Worker
+#  ----------------------------------------------------------------
+
+def _set_status(connection, updates):
+    """Apply ``(status, show_id, errors, booking_id)`` tuples at once."""
+    now = _now()
+    connection.execute("BEGIN IMMEDIATE")
+    connection.executemany(
+        "UPDATE show_bookings SET status = ?, show_id = ?, errors = ?, updated_at = ? "
+        "WHERE id = ?",
+        [(status, show_id, errors, now, booking_id)
+         for status, show_id, errors, booking_id in updates],
+    )
+    connection.execute("COMMIT")
+
+
+def claim(connection, limit):
+    """Mark up to ``limit`` queued bookings processing and return them."""
+    connection.execute("BEGIN IMMEDIATE")
+    rows = connection.execute(
+        "SELECT id, artist_id, venue_id, start_time FROM show_bookings "
+        "WHERE status = ? ORDER BY id LIMIT ?",
+        (QUEUED, limit),
+    ).fetchall()
+    connection.executemany(
+        "UPDATE show_bookings SET status = ?, updated_at = ? WHERE id = ?",
+        [(PROCESSING, _now(), row["id"]) for row in rows],
+    )
+    connection.execute("COMMIT")
+    return rows
+
+
+def _shows(rows):
+    return {
+        row["id"]: {
+            "artist_id": row["artist_id"],
+            "venue_id": row["venue_id"],
+            "start_time": datetime.datetime.fromisoformat(row["start_time"]),
+        }
+        for row in rows
+    }
+
+
+def recover(connection):
+    """Settle the bookings a dead worker left processing."""
+    rows = connection.execute(
+        "SELECT id, artist_id, venue_id, start_time FROM show_bookings WHERE status = ?",
+        (PROCESSING,),
+    ).fetchall()
+    if not rows:
+        return 0
+    shows = _shows(rows)
+    existing = dict(
+        ((artist_id, venue_id, start_time), show_id)
+        for show_id, artist_id, venue_id, start_time in db.session.execute(
+            select(Show.id, Show.artist_id, Show.venue_id, Show.start_time).where(
+                tuple_(Show.artist_id, Show.venue_id, Show.start_time).in_(
+                    [tuple(show.values()) for show in shows.values()]
+                )
+            )
+        )
+    )
+    updates = []
+    for booking_id, show in shows.items():
+        show_id = existing.get(tuple(show.values()))
+        status = QUEUED if show_id is None else BOOKED
+        updates.append((status, show_id, None, booking_id))
+    _set_status(connection, updates)
+    return len(rows)
+
+
+def process(connection, rows):
+    """Write claimed bookings to the main database; returns (booked, rejected)."""
+    shows = _shows(rows)
+    try:
+        booked, rejected = bulk.write_shows(list(shows.items()))
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        _set_status(connection, [(QUEUED, None, None, booking_id) for booking_id in shows])
+        raise
+
+    _set_status(
+        connection,
+        [(BOOKED, show_id, None, booking_id) for booking_id, show_id in booked.items()]
+        + [(REJECTED, None, json.dumps(errors), booking_id)
+           for booking_id, errors in rejected.items()],
+    )
+
+    keys = {cache_key("venues")}
+    for booking_id in booked:
+        keys.add(cache_key("show_venue", shows[booking_id]["venue_id"]))
+        keys.add(cache_key("show_artist", shows[booking_id]["artist_id"]))
+    current_app.extensions["cache"].delete(*keys)
+    return len(booked), len(rejected)
+
+
+def run(batch_size=None, poll_seconds=None, once=False, log=print):
+    """Process queued bookings until stopped, or until none are left with ``once``."""
+    batch_size = batch_size or current_app.config["SHOW_QUEUE_BATCH_SIZE"]
+    poll_seconds = poll_seconds or current_app.config["SHOW_QUEUE_POLL_SECONDS"]
+    connection = connect()
+    try:
+        recovered = recover(connection)
+        if recovered:
+            log(f"recovered {recovered} bookings left processing")
+        while True:
+            rows = claim(connection, batch_size)
+            if not rows:
+                if once:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            started = time.perf_counter()
+            try:
+                booked, rejected = process(connection, rows)
+            except SQLAlchemyError as error:
+                log(f"batch of {len(rows)} requeued: {error.__class__.__name__}: {error}")
+                if once:
+                    raise
+                time.sleep(poll_seconds)
+                continue
+            log(
+                f"booked {booked}, rejected {rejected} "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+    finally:
+        connection.close()
@@ -0,0 +1,172 @@
+"""Venue and artist summary rows for the list and search pages.
+
+``venue_summaries`` and ``artist_summaries`` hold one row per venue or
+artist with its name, location, genre list and show counts, so those
+pages read one narrow table instead of aggregating shows and genres per
+request.
+
+Rows are rebuilt, never patched: refresh() upserts the given owners'
+rows from one INSERT ... SELECT and deletes those of owners that are
+gone, so it is equally right after a create, an edit, a delete or a new
+show, and two transactions refreshing the same row both succeed, the
+later one winning. Write handlers call it in the same transaction as
+their write.
+
+A row's split into upcoming and past shows is only right until its
+next_show_at; refresh_stale() rebuilds the rows that have passed it and
+runs before every read, and ``flask refresh-summaries`` rebuilds them
+all (e.g. after a bulk import).
+"""
+import datetime
+
+from sqlalchemy import delete, func, insert, literal, literal_column, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from genres import association
+from models import db, Genre, Venue, Show, Artist, Venue_Summary, Artist_Summary
+
+# entity -> (summary model, owner model, owner column on shows)
+_SUMMARIES = {
+    "venues": (Venue_Summary, Venue, Show.venue_id),
+    "artists": (Artist_Summary, Artist, Show.artist_id),
+}
+
+GENRE_SEPARATOR = ", "
+
+
+def summary_model(entity):
+    return _SUMMARIES[entity][0]
+
+
+def _genre_list(entity, owner_id):
+    """Correlated subquery joining an owner's genre names into one string."""
+    table, owner = association(entity)
+    separator = literal_column(f"'{GENRE_SEPARATOR}'")
+    if db.engine.dialect.name == "postgresql":
+        names = func.string_agg(Genre.name, aggregate_order_by(separator, Genre.name))
+    else:
+        names = func.group_concat(Genre.name, separator)
+    return func.coalesce(
+        select(names)
+        .join_from(Genre, table, table.c.genre_id == Genre.id)
+        .where(owner == owner_id)
+        .scalar_subquery(),
+        "",
+    )
+
+
+def _summary_select(entity, now):
+    summary, model, show_owner = _SUMMARIES[entity]
+
+    def shows(aggregate, *criteria):
+        return (
+            select(aggregate)
+            .where(show_owner == model.id, *criteria)
+            .scalar_subquery()
+        )
+
+    return select(
+        model.id,
+        model.name,
+        model.city,
+        model.state,
+        _genre_list(entity, model.id),
+        shows(func.count(), Show.start_time > now),
+        shows(func.count(), Show.start_time <= now),
+        shows(func.min(Show.start_time), Show.start_time > now),
+        literal(now, summary.refreshed_at.type),
+    )
+
+
+_COLUMNS = [
+    "id",
+    "name",
+    "city",
+    "state",
+    "genres",
+    "num_upcoming_shows",
+    "num_past_shows",
+    "next_show_at",
+    "refreshed_at",
+]
+
+
+def _upsert(summary, query):
+    """INSERT ... SELECT ``query`` into ``summary``, replacing existing rows."""
+    table = summary.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(table).from_select(_COLUMNS, query)
+        return statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={column: statement.excluded[column] for column in _COLUMNS[1:]},
+        )
+    if dialect == "sqlite":
+        return insert(table).from_select(_COLUMNS, query).prefix_with("OR REPLACE")
+    raise NotImplementedError(f"summaries are not supported on {dialect}")
+
+
+def refresh(entity, ids=None, now=None):
+    """Rebuild the summary rows of ``ids`` (every row when None).
+
+    Ids whose venue or artist no longer exists just lose their row. The
+    caller commits.
+    """
+    summary, model, _ = _SUMMARIES[entity]
+    now = now or datetime.datetime.now()
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+
+    query = _summary_select(entity, now)
+    # Only rows without an owner go; the others are replaced in place.
+    remove = (
+        delete(summary)
+        .where(~select(model.id).where(model.id == summary.id).exists())
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        query = query.where(model.id.in_(ids))
+        remove = remove.where(summary.id.in_(ids))
+
+    db.session.execute(remove)
+    # In id order, so concurrent refreshes lock the rows they share in order.
+    db.session.execute(_upsert(summary, query.order_by(model.id)))
+
+
+def refresh_show(venue_id, artist_id, now=None):
+    """Rebuild the two summaries a show of ``venue_id`` and ``artist_id`` touches."""
+    refresh("venues", [venue_id], now)
+    refresh("artists", [artist_id], now)
+
+
+def show_partners(entity, owner_id):
+    """Ids of the artists a venue has shows with, or the venues of an artist.
+
+    A delete cascades to the owner's shows, which changes its partners'
+    counts; collect them first and refresh them after the delete.
+    """
+    show_owner = _SUMMARIES[entity][2]
+    partner = Show.artist_id if entity == "venues" else Show.venue_id
+    return db.session.scalars(
+        select(partner).where(show_owner == owner_id).distinct()
+    ).all()
+
+
+def refresh_stale(entity, now=None):
+    """Rebuild and commit the rows whose next show has started.
+
+    The probe is an index range scan on next_show_at, so it costs next
+    to nothing when no row is stale. Returns the number of rows rebuilt.
+    """
+    summary = summary_model(entity)
+    now = now or datetime.datetime.now()
+    stale = db.session.scalars(
+        select(summary.id).where(summary.next_show_at <= now)
+    ).all()
+    if stale:
+        refresh(entity, stale, now)
+        db.session.commit()
+    return len(stale)
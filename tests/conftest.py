@@ -0,0 +1,92 @@
+"""Fixtures of the test suite.
+
+app.py picks its config class from FLASK_ENV when it is imported, so it
+is set here first: the tests run with TestingConfig, on an in-memory
+SQLite database unless TEST_DATABASE_URL names another, and without the
+read cache.
+
+    python -m pytest
+"""
+import datetime
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("FLASK_ENV", "testing")
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+import bulk  # noqa: E402
+from app import app as fyyur  # noqa: E402
+from benchmarks import data  # noqa: E402
+
+# A show start after every generated show, for bookings that must not
+# clash with the catalog's.
+START = datetime.datetime(2031, 1, 1, 20)
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The app, inside an app context for the whole session."""
+    fyyur.config.update(
+        SLOW_REQUEST_MS=sys.maxsize,
+        SHOW_QUEUE_PATH=str(tmp_path_factory.mktemp("queue") / "show_queue.db"),
+    )
+    with fyyur.app_context():
+        yield fyyur
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def statements():
+    """The SQL statements run on any engine, in a list tests clear.
+
+    Counted on the engines' after_cursor_execute event, so statements
+    the ORM sends on its own (lazy loads, autoflushes) count too.
+    """
+    run = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        run.append(statement)
+
+    event.listen(Engine, "after_cursor_execute", record)
+    yield run
+    event.remove(Engine, "after_cursor_execute", record)
+
+
+@pytest.fixture
+def catalog(app):
+    """A fresh small catalog: 5 venues, 5 artists and 20 shows."""
+    data.generate(5, 5, 20)
+
+
+@pytest.fixture
+def start():
+    return START
+
+
+@pytest.fixture
+def refuse_insert(monkeypatch):
+    """Make bulk._insert() raise ``error`` for the rows starting at ``start_time``.
+
+    Stands for a constraint only the database enforces, such as the
+    exclusion constraints on PostgreSQL: call it as
+    ``refuse_insert(start_time, error)``.
+    """
+    insert = bulk._insert
+
+    def refuse(start_time, error):
+        def refusing_insert(table, rows):
+            if any(row.get("start_time") == start_time for row in rows):
+                raise error
+            insert(table, rows)
+
+        monkeypatch.setattr(bulk, "_insert", refusing_insert)
+
+    return refuse
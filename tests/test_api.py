@@ -0,0 +1,62 @@
+"""The /api/v1 blueprint (see api.py)."""
+import pytest
+
+from models import db, Venue, Show, Artist
+
+
+@pytest.mark.parametrize("start_time", [
+    "2031-01-01 20:00:00",
+    "2031-01-01T20:00:00",
+    "2031-01-01T20:00",
+])
+def test_show_create_takes_iso_times(client, catalog, start_time):
+    response = client.post(
+        "/api/v1/shows", json={"artist_id": 1, "venue_id": 1, "start_time": start_time}
+    )
+    assert response.status_code == 201
+
+    show = client.get(response.headers["Location"])
+    assert show.status_code == 200
+    assert show.json["id"] == response.json["id"]
+    assert show.json["start_time"] == "2031-01-01T20:00:00"
+    assert show.json["venue_name"] == "Venue 1"
+
+
+def test_show_create_names_a_bad_time(client, catalog):
+    response = client.post(
+        "/api/v1/shows", json={"artist_id": 1, "venue_id": 1, "start_time": "next friday"}
+    )
+    assert response.status_code == 400
+    assert response.json["errors"] == {"start_time": ["Not a valid datetime value."]}
+
+
+def test_show_detail_not_found(client, catalog):
+    assert client.get("/api/v1/shows/1000").status_code == 404
+
+
+@pytest.mark.parametrize("entity", ["venues", "artists"])
+def test_detail_hides_cache_keys(client, catalog, entity):
+    response = client.get(f"/api/v1/{entity}/1")
+    assert response.status_code == 200
+    assert "next_show_time" not in response.json
+    assert all(
+        "version" not in show
+        for key in ("past_shows", "upcoming_shows")
+        for show in response.json[key]
+    )
+
+
+@pytest.mark.parametrize("q, key, name", [
+    ("Venue 1", "venue_id", "Venue 1"),
+    ("Artist 2", "artist_id", "Artist 2"),
+])
+def test_show_search_by_artist_or_venue(client, catalog, q, key, name):
+    owner = Venue if key == "venue_id" else Artist
+    owner_id = db.session.query(owner.id).filter(owner.name == name).scalar()
+    expected = db.session.query(Show).filter(getattr(Show, key) == owner_id).count()
+
+    response = client.get("/api/v1/shows/search", query_string={"q": q, "limit": 100})
+    assert response.status_code == 200
+    assert response.json["count"] == expected > 0
+    assert {show[key] for show in response.json["data"]} == {owner_id}
+    assert len(response.json["data"]) == expected
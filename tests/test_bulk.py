@@ -0,0 +1,102 @@
+"""Bulk import and export, and the API creates sharing their validation."""
+import datetime
+import json
+
+import pytest
+
+import bulk
+from benchmarks import data
+from models import db, Venue, Show, Artist
+
+
+def venue_row(**values):
+    return {
+        "name": "The Bench",
+        "city": "San Francisco",
+        "state": "CA",
+        "address": "1 Bench St",
+        "phone": "555-0100",
+        "genres": ["Jazz"],
+        "facebook_link": "https://www.facebook.com/bench",
+        **values,
+    }
+
+
+@pytest.mark.parametrize("value", [True, False])
+def test_validate_row_keeps_json_booleans(app, value):
+    with app.test_request_context():
+        row, errors = bulk.validate_row("venues", venue_row(seeking_talent=value))
+    assert errors is None
+    assert row["seeking_talent"] is value
+
+
+@pytest.mark.parametrize("entity, model, field", [
+    ("venues", Venue, "seeking_talent"),
+    ("artists", Artist, "seeking_venue"),
+])
+@pytest.mark.parametrize("value", [True, False])
+def test_api_create_stores_json_booleans(client, catalog, entity, model, field, value):
+    payload = venue_row(**{field: value})
+    if entity == "artists":
+        del payload["address"]
+    response = client.post(f"/api/v1/{entity}", json=payload)
+    assert response.status_code == 201
+    assert getattr(db.session.get(model, response.json["id"]), field) is value
+
+
+def export(entity, fmt, path):
+    path.write_text("".join(bulk.iter_export(entity, fmt)), encoding="utf-8")
+    return path
+
+
+def rows(path):
+    # An empty text and a missing one import alike.
+    return [
+        {key: value if value != "" else None for key, value in row.items()}
+        for _, row in bulk.read_rows(str(path))
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_imports_as_is(app, tmp_path, fmt):
+    data.generate(10, 10, 1)
+    db.session.query(Show).delete()
+    start = datetime.datetime(2031, 1, 1, 20)
+    db.session.add_all(
+        Show(venue_id=day % 10 + 1, artist_id=day % 7 + 1,
+             start_time=start + datetime.timedelta(days=day))
+        for day in range(30)
+    )
+    db.session.commit()
+    exported = {
+        entity: export(entity, fmt, tmp_path / f"{entity}.{fmt}") for entity in bulk.ENTITIES
+    }
+
+    db.drop_all()
+    db.create_all()
+    with app.test_request_context():
+        for entity, path in exported.items():
+            report = bulk.import_file(entity, str(path))
+            assert report.rejected == []
+
+    for entity, path in exported.items():
+        again = export(entity, fmt, tmp_path / f"again.{entity}.{fmt}")
+        assert rows(again) == rows(path)
+
+
+def test_import_rejects_taken_ids(app, catalog, tmp_path):
+    path = tmp_path / "venues.jsonl"
+    path.write_text("".join(
+        json.dumps(venue_row(**values)) + "\n"
+        for values in ({"id": 3}, {"id": 100}, {}, {"id": 100})
+    ), encoding="utf-8")
+
+    with app.test_request_context():
+        report = bulk.import_file("venues", str(path))
+
+    assert report.accepted == 2
+    assert [(item["line"], item["errors"]) for item in report.rejected] == [
+        (1, {"id": ["Id already in use."]}),
+        (4, {"id": ["Id already in use."]}),
+    ]
+    assert db.session.query(Venue).filter_by(name="The Bench").count() == 2
@@ -0,0 +1,78 @@
+"""Show scheduling conflicts, including those only the database catches."""
+import datetime
+import json
+import types
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import IntegrityError
+
+import bulk
+import conflicts
+import summaries
+
+
+def refusal(constraint=None):
+    """An IntegrityError like psycopg2's, naming ``constraint``."""
+    orig = types.SimpleNamespace(diag=types.SimpleNamespace(constraint_name=constraint))
+    return IntegrityError("INSERT INTO shows", {}, orig)
+
+
+@pytest.mark.parametrize("constraint, field", [
+    ("ex_shows_venue_id_block", "venue_id"),
+    ("ex_shows_artist_id_block", "artist_id"),
+    ("uq_shows_artist_id_venue_id_start_time", "start_time"),
+    (None, "start_time"),
+])
+def test_violation_errors_name_the_clash(constraint, field):
+    assert list(conflicts.violation_errors(refusal(constraint), 2, 3)) == [field]
+
+
+def test_import_rejects_rows_the_database_refuses(
+    app, catalog, tmp_path, start, refuse_insert
+):
+    path = tmp_path / "shows.jsonl"
+    path.write_text("".join(
+        json.dumps({
+            "artist_id": day + 1,
+            "venue_id": day + 1,
+            "start_time": str(start + datetime.timedelta(days=day)),
+        }) + "\n"
+        for day in range(3)
+    ))
+    refuse_insert(start + datetime.timedelta(days=1), refusal("ex_shows_venue_id_block"))
+    with app.test_request_context():
+        report = bulk.import_file("shows", str(path))
+
+    assert report.accepted == 2
+    assert [item["line"] for item in report.rejected] == [2]
+    assert list(report.rejected[0]["errors"]) == ["venue_id"]
+
+
+def test_api_reports_refused_overlap(client, catalog, start, monkeypatch):
+    def refuse(venue_id, artist_id, now=None):
+        raise refusal("ex_shows_artist_id_block")
+
+    monkeypatch.setattr(summaries, "refresh_show", refuse)
+    response = client.post(
+        "/api/v1/shows", json={"artist_id": 1, "venue_id": 1, "start_time": str(start)}
+    )
+    assert response.status_code == 409
+    assert list(response.json["errors"]) == ["artist_id"]
+
+
+@pytest.mark.parametrize("uri, minutes, refused", [
+    ("postgresql://localhost/fyyur", 150, False),
+    ("postgresql+psycopg2://localhost/fyyur", 180, True),
+    ("sqlite://", 180, False),
+])
+def test_block_must_match_the_constraints(uri, minutes, refused):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=uri, SHOW_DURATION_MINUTES=minutes - 30, SHOW_BUFFER_MINUTES=30
+    )
+    if refused:
+        with pytest.raises(RuntimeError, match="CONSTRAINT_MINUTES"):
+            conflicts.init_app(app)
+    else:
+        conflicts.init_app(app)
@@ -0,0 +1,25 @@
+"""Each view's main query reads its hot tables by index (see explain.py)."""
+import pytest
+
+import explain
+from benchmarks import data
+
+IDS = {"venue_id": 1, "artist_id": 1, "term": "music", "genre": "Jazz"}
+
+
+@pytest.fixture(scope="module")
+def catalog(app):
+    # Big enough that a scan would cost more than an index lookup.
+    data.generate(400, 400, 10000)
+
+
+@pytest.mark.parametrize("view", explain.VIEW_QUERIES)
+def test_view_checks_some_table(view):
+    _, indexed_tables = explain.VIEW_QUERIES[view]
+    assert indexed_tables
+
+
+@pytest.mark.parametrize("view", explain.VIEW_QUERIES)
+def test_view_query_is_index_backed(view, catalog):
+    plan, offending = explain.check_view(view, IDS)
+    assert not offending, "\n".join(plan)
@@ -0,0 +1,78 @@
+"""The {% cache %} template fragment cache (see fragments.py)."""
+import sys
+
+import jinja2
+import pytest
+
+from fragments import FragmentCache, FragmentCacheExtension
+
+
+@pytest.fixture
+def environment():
+    environment = jinja2.Environment(extensions=[FragmentCacheExtension])
+    environment.fragment_cache = FragmentCache(1024 * 1024)
+    return environment
+
+
+@pytest.fixture
+def renders():
+    """Calls of ``render()``, which a template's cached body makes."""
+    calls = []
+
+    def render(value):
+        calls.append(value)
+        return value
+
+    render.calls = calls
+    return render
+
+
+def test_body_renders_once_per_key(environment, renders):
+    template = environment.from_string(
+        "{% cache id, version %}<li>{{ render(name) }}</li>{% endcache %}"
+    )
+    first = template.render(id=1, version=1, name="Old", render=renders)
+    again = template.render(id=1, version=1, name="New", render=renders)
+    bumped = template.render(id=1, version=2, name="New", render=renders)
+
+    assert (first, again, bumped) == ("<li>Old</li>", "<li>Old</li>", "<li>New</li>")
+    assert renders.calls == ["Old", "New"]
+    assert environment.fragment_cache.stats() == {"hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_blocks_do_not_share_keys(environment, renders):
+    template = environment.from_string(
+        "{% cache id %}a{{ render('a') }}{% endcache %}"
+        "{% cache id %}b{{ render('b') }}{% endcache %}"
+    )
+    assert template.render(id=1, render=renders) == "aabb"
+    assert template.render(id=1, render=renders) == "aabb"
+    assert renders.calls == ["a", "b"]
+
+
+def test_disabled_cache_always_renders(environment, renders):
+    environment.fragment_cache = None
+    template = environment.from_string("{% cache 1 %}{{ render('x') }}{% endcache %}")
+    template.render(render=renders)
+    template.render(render=renders)
+    assert renders.calls == ["x", "x"]
+
+
+def test_least_recently_used_goes_first():
+    size = sys.getsizeof("aaaa")
+    cache = FragmentCache(2 * size)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("aaaa", None, "cccc")
+    assert cache.size == 2 * size
+    assert cache.stats()["evictions"] == 1
+
+
+def test_fragment_larger_than_the_cache_is_not_kept():
+    cache = FragmentCache(10)
+    cache.set("a", "a" * 100)
+    assert cache.get("a") is None
+    assert cache.size == 0
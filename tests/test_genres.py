@@ -0,0 +1,60 @@
+"""Genre set writes (see genres.py)."""
+import datetime
+
+import genres
+from models import db, Genre, Venue
+
+
+def venue_genres(venue_id):
+    return genres.genre_names("venues", [venue_id])[venue_id]
+
+
+def writes(statements):
+    return [sql.split()[0] for sql in statements if not sql.lstrip().startswith("SELECT")]
+
+
+def test_set_genres_writes_only_the_difference(catalog, statements):
+    genres.set_genres("venues", 1, ["Jazz", "Blues"])
+    db.session.commit()
+
+    statements.clear()
+    assert genres.set_genres("venues", 1, ["Jazz", " Folk ", ""])
+    assert venue_genres(1) == ["Folk", "Jazz"]
+    # A delete for Blues, an insert for Folk and the updated_at bump.
+    assert sorted(writes(statements)) == ["DELETE", "INSERT", "UPDATE"]
+
+
+def test_set_genres_adds_new_names_once(catalog):
+    assert genres.set_genres("artists", 1, ["Sea Shanty"])
+    assert genres.set_genres("artists", 2, ["Sea Shanty", "Jazz"])
+    db.session.commit()
+    assert genres.genre_names("artists", [1, 2]) == {
+        1: ["Sea Shanty"], 2: ["Jazz", "Sea Shanty"],
+    }
+    assert db.session.query(Genre).filter_by(name="Sea Shanty").count() == 1
+
+
+def test_set_genres_leaves_an_unchanged_set_alone(catalog, statements):
+    genres.set_genres("venues", 1, ["Jazz", "Blues"])
+    db.session.commit()
+    stamp = datetime.datetime(2000, 1, 1)
+    db.session.get(Venue, 1).updated_at = stamp
+    db.session.commit()
+
+    statements.clear()
+    assert not genres.set_genres("venues", 1, ["Blues", "Jazz", "Jazz"])
+    assert writes(statements) == []
+    db.session.expire_all()
+    assert db.session.get(Venue, 1).updated_at == stamp
+
+
+def test_set_genres_touches_only_when_asked(catalog):
+    stamp = datetime.datetime(2000, 1, 1)
+    db.session.get(Venue, 1).updated_at = stamp
+    db.session.commit()
+
+    assert genres.set_genres("venues", 1, ["Reggae"], touch=False)
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Venue, 1).updated_at == stamp
+    assert venue_genres(1) == ["Reggae"]
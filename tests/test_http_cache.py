@@ -0,0 +1,42 @@
+"""Conditional GETs and the read cache behind them (see http_cache.py)."""
+import pytest
+
+from benchmarks import data
+from cache import Cache, LRUBackend
+from models import db, Venue
+
+
+@pytest.fixture
+def lru(app, monkeypatch):
+    """The app's cache, on an in-process LRU backend for the test."""
+    cache = app.extensions["cache"]
+    monkeypatch.setattr(cache, "backend", LRUBackend(100))
+    monkeypatch.setattr(cache, "default_ttl", 300)
+    return cache
+
+
+def test_get_or_set_rebuilds_other_versions():
+    cache = Cache()
+    cache.backend, cache.default_ttl = LRUBackend(10), 300
+
+    assert cache.get_or_set("key", lambda: "a", version=1) == "a"
+    assert cache.get_or_set("key", lambda: "b", version=1) == "a"
+    assert cache.get_or_set("key", lambda: "c", version=2) == "c"
+    assert cache.get_or_set("key", lambda: "d") == "c"
+    assert cache.stats()["misses"] == 2
+
+
+def test_body_is_never_older_than_its_etag(client, lru):
+    data.generate(5, 5, 20)
+    first = client.get("/venues/1")
+    assert b"Venue 1" in first.data
+
+    # Another worker renames the venue; its cache delete misses this
+    # process's LRU.
+    db.session.get(Venue, 1).name = "Renamed Hall"
+    db.session.commit()
+
+    second = client.get("/venues/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert b"Renamed Hall" in second.data
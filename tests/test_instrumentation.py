@@ -0,0 +1,53 @@
+"""Per-request SQL instrumentation (see instrumentation.py)."""
+import logging
+import re
+
+import pytest
+
+from instrumentation import fingerprint
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT * FROM venues WHERE id = 42", "SELECT * FROM venues WHERE id = ?"),
+    ("SELECT * FROM venues WHERE name = 'Bob''s'", "SELECT * FROM venues WHERE name = ?"),
+    ("SELECT * FROM shows WHERE venue_id IN (?, ?, ?)",
+     "SELECT * FROM shows WHERE venue_id IN (...)"),
+    ("SELECT * FROM shows\n  WHERE artist_id = %(artist_id_1)s",
+     "SELECT * FROM shows WHERE artist_id = ?"),
+    ("SELECT * FROM shows WHERE venue_id = :venue_id",
+     "SELECT * FROM shows WHERE venue_id = ?"),
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
+
+
+def test_server_timing_counts_the_request_statements(client, catalog, statements):
+    statements.clear()
+    response = client.get("/api/v1/venues")
+    timing = response.headers["Server-Timing"]
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries", total;dur=[\d.]+', timing)
+    assert timing.split('"')[1] == f"{len(statements)} queries"
+
+
+def test_server_timing_can_be_turned_off(app, client, catalog, monkeypatch):
+    monkeypatch.setitem(app.config, "SERVER_TIMING", False)
+    assert "Server-Timing" not in client.get("/api/v1/venues").headers
+
+
+def test_slow_requests_are_logged_with_their_statements(
+    app, client, catalog, monkeypatch, caplog
+):
+    monkeypatch.setitem(app.config, "SLOW_REQUEST_MS", 0)
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get("/api/v1/venues/1")
+
+    [record] = [record for record in caplog.records if record.name == app.logger.name]
+    header, *lines = record.getMessage().splitlines()
+    assert header.startswith("slow request GET /api/v1/venues/1 (api.venue_detail) 200 in ")
+    assert lines and all(re.match(r"  \d+x [\d.]+ ms SELECT ", line) for line in lines)
+
+
+def test_fast_requests_are_not_logged(app, client, catalog, caplog):
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get("/api/v1/venues/1")
+    assert [record for record in caplog.records if record.name == app.logger.name] == []
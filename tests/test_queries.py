@@ -0,0 +1,28 @@
+"""Query helpers of the pages (see queries.py)."""
+import pytest
+
+import queries
+from benchmarks import data
+
+
+@pytest.fixture(scope="module")
+def listings(app):
+    data.generate(40, 40, 1)
+    return {"venues": queries.venue_browse, "artists": queries.artist_browse}
+
+
+@pytest.mark.parametrize("entity", ["venues", "artists"])
+def test_facets_ignore_their_own_filter(listings, entity):
+    browse = listings[entity]
+    facets = browse()["facets"]
+    (genre, _), (state, _) = facets["genre"][0], facets["state"][0]
+
+    # A filter leaves its own facet whole, so the other pills stay.
+    assert browse(state=state)["facets"]["state"] == facets["state"]
+    assert browse(genre=genre)["facets"]["genre"] == facets["genre"]
+
+    # Each facet counts what its links list: the other filter applies.
+    both = browse(genre=genre, state=state)["facets"]
+    assert both["state"] == browse(genre=genre)["facets"]["state"]
+    assert both["genre"] == browse(state=state)["facets"]["genre"]
+    assert dict(both["state"])[state] == dict(both["genre"])[genre]
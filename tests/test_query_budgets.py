@@ -0,0 +1,65 @@
+"""Statement counts of every route, against benchmarks.budgets.BUDGETS.
+
+A request may run no more statements than its route's budget, and no
+more on a bigger catalog than on the smallest: a per-row query in a
+view or a template loop shows up here long before it is slow.
+"""
+import collections
+import datetime
+
+import pytest
+
+from benchmarks import budgets, data, routes
+
+# Shows start 7 to 11 hours after a multiple of days from here, so none
+# starts during the run and turns a summary stale (see budgets.check).
+START = datetime.datetime.now() - datetime.timedelta(hours=12)
+
+
+def send(client, item, statements):
+    """Statements one cold request of scenario ``item`` runs."""
+    request = routes.prepare(client, item, cold=True)
+    statements.clear()
+    response = request()
+    response.get_data()
+    assert response.status_code < 400, item.label
+    return len(statements)
+
+
+@pytest.fixture(scope="module")
+def counts(app, statements):
+    """Statements per scenario label, at each of budgets.SIZES in turn."""
+    counts = collections.defaultdict(list)
+    for venues, artists, shows in budgets.SIZES:
+        data.generate(venues, artists, shows, start=START)
+        client = app.test_client()
+        for item in routes.SCENARIOS:
+            counts[item.label].append(send(client, item, statements))
+    return counts
+
+
+def test_every_route_has_a_scenario_and_a_budget():
+    assert routes.missing_endpoints() == []
+    assert [item.label for item in routes.SCENARIOS if item.label not in budgets.BUDGETS] == []
+
+
+@pytest.mark.parametrize("item", routes.SCENARIOS, ids=lambda item: item.label)
+def test_within_budget(item, counts):
+    assert max(counts[item.label]) <= budgets.BUDGETS[item.label]
+
+
+@pytest.mark.parametrize("item", routes.SCENARIOS, ids=lambda item: item.label)
+def test_no_growth_with_catalog_size(item, counts):
+    smallest, *bigger = counts[item.label]
+    assert all(count <= smallest for count in bigger), counts[item.label]
+
+
+def test_venues_constant_in_venue_count(app, client, statements):
+    # The listing once ran a query per city and state of venue.
+    item = next(item for item in routes.SCENARIOS if item.label == "venues")
+    found = []
+    for venues in (10, 100, 1000):
+        data.generate(venues, 20, 200, start=START)
+        found.append(send(client, item, statements))
+    assert found == [found[0]] * len(found)
+    assert found[0] <= budgets.BUDGETS["venues"]
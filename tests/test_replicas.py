@@ -0,0 +1,66 @@
+"""Read-replica routing (see replicas.py)."""
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from models import db
+from replicas import read_only, writes
+
+
+@pytest.fixture
+def routed(app, tmp_path):
+    """A client of an app with one replica whose views name their bind."""
+    routed = Flask(__name__)
+    routed.config.update(
+        SECRET_KEY="test",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"],
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        REPLICA_MAX_LAG_SECONDS=60,
+    )
+
+    def bind():
+        return db.session().get_bind().url.database.rsplit("/", 1)[-1]
+
+    def write_then_read():
+        db.session.execute(text("CREATE TABLE IF NOT EXISTS notes (body TEXT)"))
+        return bind()
+
+    routed.add_url_rule("/read", "read", bind)
+    routed.add_url_rule("/create", "create", lambda: bind(), methods=["POST"])
+    routed.add_url_rule("/migrate", "migrate", write_then_read)
+    routed.add_url_rule("/search", "search", read_only(lambda: bind()), methods=["POST"])
+    routed.add_url_rule("/delete", "delete", writes(lambda: bind()))
+    db.init_app(routed)
+    # The scoped session belongs to the thread: drop the one of the
+    # session-wide app context so requests open theirs on this app.
+    db.session.remove()
+    yield routed.test_client()
+    db.session.remove()
+
+
+def test_reads_go_to_the_replica(routed):
+    assert routed.get("/read").get_data(as_text=True) == "replica.db"
+    assert routed.post("/search").get_data(as_text=True) == "replica.db"
+
+
+def test_write_views_use_the_primary_and_pin_the_client(routed):
+    assert routed.get("/delete").get_data(as_text=True) == "primary.db"
+    assert routed.get("/read").get_data(as_text=True) == "primary.db"
+
+
+def test_other_posts_use_the_primary_and_pin_the_client(routed):
+    assert routed.post("/create").get_data(as_text=True) == "primary.db"
+    assert routed.get("/read").get_data(as_text=True) == "primary.db"
+
+
+def test_pin_lasts_the_replica_lag(routed):
+    routed.application.config["REPLICA_MAX_LAG_SECONDS"] = 0
+    routed.post("/create")
+    assert routed.get("/read").get_data(as_text=True) == "replica.db"
+
+
+def test_a_write_moves_the_rest_of_the_request_to_the_primary(routed):
+    assert routed.get("/migrate").get_data(as_text=True) == "primary.db"
+    # Only write views pin the client, not the writes of a read view.
+    assert routed.get("/read").get_data(as_text=True) == "replica.db"
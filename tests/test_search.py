@@ -0,0 +1,43 @@
+"""Venue and artist search (see search.py), on SQLite's FTS5 backend."""
+import pytest
+
+import genres
+import search
+from models import db, Venue, Venue_Summary
+
+
+@pytest.mark.parametrize("offset", [0, 2, 5, 10])
+def test_count_is_the_total_on_any_page(catalog, offset):
+    count, hits = search.search_venues("Venue", limit=2, offset=offset)
+    assert count == 5
+    assert len(hits) == max(0, min(2, 5 - offset))
+
+
+def names(hits):
+    return [hit["name"] for hit in hits]
+
+
+def test_matches_names_anywhere(catalog):
+    upcoming = db.session.get(Venue_Summary, 3).num_upcoming_shows
+    assert search.search_venues("ENUE 3") == (
+        1, [{"id": 3, "name": "Venue 3", "num_upcoming_shows": upcoming}]
+    )
+    # Shorter than a trigram: LIKE over the same table.
+    assert names(search.search_artists("4")[1]) == ["Artist 4"]
+
+
+def test_matches_location_and_genres(catalog):
+    venue = db.session.get(Venue, 2)
+    count, hits = search.search_venues(f"{venue.city} {venue.state}")
+    assert 2 in {hit["id"] for hit in hits}
+    assert count == db.session.query(Venue).filter_by(city=venue.city, state=venue.state).count()
+
+    genres.set_genres("artists", 5, ["Sea Shanty"])
+    db.session.commit()
+    assert names(search.search_artists("shanty")[1]) == ["Artist 5"]
+
+
+def test_empty_term_lists_everything_by_name(catalog):
+    count, hits = search.search_venues("")
+    assert count == 5
+    assert names(hits) == [f"Venue {id}" for id in range(1, 6)]
@@ -0,0 +1,42 @@
+"""The queued show booking worker (see show_queue.py)."""
+import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import show_queue
+from models import db, Show
+
+
+@pytest.fixture
+def queue(app, catalog):
+    """The queue on a fresh catalog, in an app context of its own for its connection."""
+    with app.app_context():
+        connection = show_queue.connect()
+        connection.execute("DELETE FROM show_bookings")
+        yield connection
+        connection.close()
+
+
+def enqueue(start, day):
+    return show_queue.enqueue({
+        "artist_id": day + 1,
+        "venue_id": day + 1,
+        "start_time": start + datetime.timedelta(days=day),
+    })
+
+
+def test_refused_booking_is_rejected_alone(queue, start, refuse_insert):
+    ids = [enqueue(start, day) for day in range(3)]
+    refuse_insert(
+        start + datetime.timedelta(days=1),
+        IntegrityError("INSERT INTO shows", {}, Exception("refused")),
+    )
+    show_queue.run(once=True, log=lambda line: None)
+
+    statuses = [show_queue.booking(booking_id)["status"] for booking_id in ids]
+    assert statuses == [show_queue.BOOKED, show_queue.REJECTED, show_queue.BOOKED]
+    assert sorted(db.session.scalars(
+        select(Show.start_time).where(Show.start_time >= start)
+    )) == [start, start + datetime.timedelta(days=2)]
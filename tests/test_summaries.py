@@ -0,0 +1,63 @@
+"""Venue and artist summary rows (see summaries.py)."""
+import datetime
+
+from sqlalchemy import func, select
+
+import genres
+import summaries
+from models import db, Venue, Show, Artist, Venue_Summary, Artist_Summary
+
+
+def counts(column, owner_id, now):
+    shows = db.session.query(Show.start_time).filter(column == owner_id).all()
+    upcoming = sorted(start for start, in shows if start > now)
+    return len(upcoming), len(shows) - len(upcoming), upcoming[0] if upcoming else None
+
+
+def test_refresh_rebuilds_the_rows_from_the_shows(catalog, start):
+    now = datetime.datetime.now()
+    db.session.add(Show(venue_id=2, artist_id=3, start_time=start))
+    summaries.refresh_show(2, 3, now)
+    db.session.commit()
+
+    for summary, column, owner_id in (
+        (Venue_Summary, Show.venue_id, 2), (Artist_Summary, Show.artist_id, 3),
+    ):
+        row = db.session.get(summary, owner_id)
+        assert (row.num_upcoming_shows, row.num_past_shows, row.next_show_at) == counts(
+            column, owner_id, now
+        )
+        assert row.refreshed_at == now
+
+
+def test_refresh_follows_edits_and_deletes(catalog):
+    genres.set_genres("artists", 1, ["Jazz", "Blues"])
+    db.session.get(Artist, 1).name = "Renamed"
+    db.session.delete(db.session.get(Venue, 1))
+    db.session.flush()
+    summaries.refresh("artists", [1])
+    summaries.refresh("venues", [1])
+    db.session.commit()
+
+    row = db.session.get(Artist_Summary, 1)
+    assert row.name == "Renamed"
+    assert sorted(row.genres.split(summaries.GENRE_SEPARATOR)) == ["Blues", "Jazz"]
+    assert db.session.get(Venue_Summary, 1) is None
+    assert db.session.query(Venue_Summary).count() == 4
+
+
+def test_refresh_of_no_ids_writes_nothing(catalog, statements):
+    statements.clear()
+    summaries.refresh("venues", [])
+    assert statements == []
+
+
+def test_refresh_stale_rebuilds_rows_whose_next_show_started(catalog):
+    later = db.session.scalar(select(func.max(Show.start_time))) + datetime.timedelta(minutes=1)
+    upcoming = db.session.query(Venue_Summary).filter(Venue_Summary.num_upcoming_shows > 0)
+    stale = upcoming.count()
+
+    assert stale > 0
+    assert summaries.refresh_stale("venues", now=later) == stale
+    assert upcoming.count() == 0
+    assert summaries.refresh_stale("venues", now=later) == 0